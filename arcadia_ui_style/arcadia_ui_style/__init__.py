@@ -1,4 +1,4 @@
-from .templates import ensure_templates
+from .templates import ensure_templates, get_env, get_template
 from .theme import ThemeManager
 
-__all__ = ["ensure_templates", "ThemeManager"]
+__all__ = ["ensure_templates", "get_env", "get_template", "ThemeManager"]
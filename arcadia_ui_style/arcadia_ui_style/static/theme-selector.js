@@ -10,19 +10,22 @@
     console.log('Available themes:', Object.keys(PRESETS));
     
     const root = document.documentElement;
-    console.log('Before - root classes:', root.className);
+    const vars = PRESETS[name];
+    if (!vars) {
+      console.log('Unknown theme:', name);
+      return;
+    }
+    
+    // Set tokens directly on :root; inline variables take effect in one
+    // style recalc, whatever .theme-* rules the stylesheet carries
+    for (const k in vars) root.style.setProperty(k, vars[k]);
     
-    // Remove all theme classes
+    // Keep the .theme-* class set by the early init script in step, for
+    // stylesheets and app CSS keyed on it
     Object.keys(PRESETS).forEach(themeName => {
-      console.log('Removing class: theme-' + themeName);
-      root.classList.remove('theme-' + themeName);
+      if (themeName !== name) root.classList.remove('theme-' + themeName);
     });
-    
-    // Apply new theme
-    if (name !== 'light') {
-      console.log('Adding class: theme-' + name);
-      root.classList.add('theme-' + name);
-    }
+    root.classList.add('theme-' + name);
     
     // Verify CSS is working by checking computed styles
     setTimeout(() => {
@@ -30,7 +33,6 @@
       const computedFg = getComputedStyle(root).getPropertyValue('--fg'); 
       console.log('Applied CSS variables --bg:', computedBg.trim());
       console.log('Applied CSS variables --fg:', computedFg.trim());
-      console.log('HTML classes after apply:', root.className);
     }, 100);
     
     // Store preference
@@ -52,72 +54,6 @@
     applyTheme(saved);
   }
   
-  function initThemeSubmenu() {
-    const trigger = document.getElementById('theme-menu-trigger');
-    const submenu = document.getElementById('theme-submenu');
-    
-    if (!trigger || !submenu) {
-      console.log('Theme selector elements not found');
-      return;
-    }
-    
-    console.log('Building submenu for themes:', Object.keys(PRESETS));
-    // Build theme items
-    submenu.innerHTML = '';
-    
-    Object.keys(PRESETS).forEach((themeName, index) => {
-      console.log('Creating theme item:', themeName);
-      const theme = PRESETS[themeName];
-      const displayName = DISPLAY_NAMES[themeName] || themeName;
-      
-      const button = document.createElement('button');
-      button.className = 'theme-item theme-' + themeName;
-      button.setAttribute('data-theme', themeName);
-      button.style.cssText = 'width:100%;padding:0.5rem 0.75rem;border:none;background:var(--panel);text-align:left;cursor:pointer;font-size:14px;font-family:inherit;display:flex;align-items:center;gap:8px;color:var(--fg);';
-      
-      // Add margin for items after the first
-      if (index > 0) {
-        button.style.marginTop = '6px';
-      }
-      
-      // Theme label
-      const label = document.createElement('span');
-      label.textContent = displayName;
-      button.appendChild(label);
-      
-      // No color swatches; keep item minimal with label only
-      submenu.appendChild(button);
-      
-      // Add click handler
-      button.addEventListener('click', (e) => {
-        e.preventDefault();
-        console.log('Theme item clicked:', themeName);
-        const selectedThemeName = button.getAttribute('data-theme');
-        applyTheme(selectedThemeName);
-        
-        try {
-          // Save to server if available
-          const csrf = document.body.dataset && document.body.dataset.csrf || '';
-          if (csrf) {
-            fetch('/theme', { 
-              method:'POST', 
-              headers:{
-                'Content-Type':'application/json',
-                'X-CSRF-Token': csrf
-              }, 
-              body: JSON.stringify({ name: selectedThemeName, vars: {} }) 
-            }).catch(()=>{});
-          }
-        } catch {}
-        
-        // Close submenu
-        submenu.style.display = 'none';
-      });
-    });
-    
-    console.log('Submenu built with', submenu.children.length, 'items');
-  }
-  
   function buildThemeMenu() {
     const submenu = document.getElementById('theme-submenu');
     if (!submenu) {
@@ -127,6 +63,8 @@
     
     console.log('Building theme menu for themes:', Object.keys(PRESETS));
     submenu.innerHTML = '';  // Clear first (AI Chat approach)
+    // Collect items off-DOM so the submenu reflows once, not per item
+    const frag = document.createDocumentFragment();
     
     Object.keys(PRESETS).forEach((themeName, index) => {
       console.log('Creating theme item:', themeName);
@@ -145,19 +83,9 @@
       button.appendChild(label);
       
       // No color swatches; minimal label-only item
-      submenu.appendChild(button);
-      
-      // Add click handler
-      button.addEventListener('click', (e) => {
-        e.preventDefault();
-        console.log('Theme item clicked:', themeName);
-        const selectedThemeName = button.getAttribute('data-theme');
-        applyTheme(selectedThemeName);
-        
-        // Close submenu immediately
-        submenu.style.display = 'none';
-      });
+      frag.appendChild(button);
     });
+    submenu.appendChild(frag);
     
     console.log('Theme menu built with', submenu.children.length, 'items');
   }
@@ -168,12 +96,15 @@
     
     if (!trigger || !submenu) return;
     
+    // Presets are static for the page lifetime; build the items once and
+    // only toggle visibility on open/close
+    buildThemeMenu();
+    
     let hideTimer = null;
     
     function openMenu() {
       clearTimeout(hideTimer);
       submenu.style.display = 'block';
-      buildThemeMenu(); // Build BEFORE showing (AI Chat approach)
     }
     
     function closeSoon() {
@@ -191,6 +122,18 @@
     
     submenu.addEventListener('mouseleave', closeSoon);
     
+    // Single delegated handler for all theme items (survives menu rebuilds)
+    submenu.addEventListener('click', (e) => {
+      const btn = e.target.closest('.theme-item');
+      if (!btn) return;
+      e.preventDefault();
+      console.log('Theme item clicked:', btn.dataset.theme);
+      applyTheme(btn.dataset.theme);
+      
+      // Close submenu immediately
+      submenu.style.display = 'none';
+    });
+    
     trigger.addEventListener('click', (e) => {
       e.preventDefault();
       console.log('Theme trigger clicked');
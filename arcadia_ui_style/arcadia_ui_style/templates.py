@@ -7,5 +7,6 @@ public API to preserve import paths for consuming apps.
 """
 
 from .templates_v2 import ensure_templates as ensure_templates  # re-export
+from .templates_v2 import get_env as get_env, get_template as get_template  # re-export
 
-__all__ = ["ensure_templates"]
+__all__ = ["ensure_templates", "get_env", "get_template"]
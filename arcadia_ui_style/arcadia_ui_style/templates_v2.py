@@ -1,91 +1,119 @@
 from __future__ import annotations
 
+import functools
+import hashlib
+import os
 from pathlib import Path
-from typing import Tuple
+from typing import List, Optional, Set, Tuple
 
+from jinja2 import Environment, FileSystemLoader, Template
 
-_HEADER_SENTINEL = "<!-- arcadia-ui-style:v2 -->"
+from ._assets import (
+    AUTH_BYTES,
+    FOOTER_BYTES,
+    HEADER_BYTES,
+    HEADER_HTML,
+    HEADER_SENTINEL,
+    LEGACY_CSS_BYTES,
+    LOGIN_BYTES,
+    SETTINGS_BYTES,
+    SIGNUP_BYTES,
+    USER_MENU_BYTES,
+)
 
 
 def _ensure_dirs(app_dir: str) -> Tuple[Path, Path]:
     tdir = Path(app_dir) / "templates"
     sdir = Path(app_dir) / "static"
-    tdir.mkdir(parents=True, exist_ok=True)
-    sdir.mkdir(parents=True, exist_ok=True)
+    # Directories normally exist already; a stat is cheaper than mkdir's EEXIST path
+    for d in (tdir, sdir):
+        if not os.path.isdir(d):
+            d.mkdir(parents=True, exist_ok=True)
     return tdir, sdir
 
 
-def _should_rewrite(path: Path, sentinel: str) -> bool:
-    if not path.exists():
-        return True
-    try:
-        content = path.read_text(encoding="utf-8", errors="ignore")
-    except Exception:
-        return True
-    return sentinel not in content
+def _scan(d: Path) -> Set[str]:
+    """Return the entry names in d with a single directory read."""
+    with os.scandir(d) as it:
+        return {e.name for e in it}
 
 
-def _write_header(tdir: Path) -> None:
-    header = tdir / "_header.html"
-    if not _should_rewrite(header, _HEADER_SENTINEL):
-        return
-    header.write_text(
-        _HEADER_SENTINEL + """
-<!-- Early theme init to avoid flash -->
-<script>(function(){try{var k='arcadia.theme',t=null;try{t=localStorage.getItem(k);}catch(e){} if(!t){try{var m=document.cookie.match(/(?:^|; )theme=([^;]+)/); t=m?decodeURIComponent(m[1]):null;}catch(e){}} if(!t){t=(window.matchMedia&&matchMedia('(prefers-color-scheme: dark)').matches)?'dark':'light';}var de=document.documentElement;de.classList.add(t==='dark'?'theme-dark':'theme-light','no-theme-transitions');var meta=document.createElement('meta');meta.name='color-scheme';meta.content=(t==='dark')?'dark light':'light dark';document.head.appendChild(meta);document.addEventListener('DOMContentLoaded',function(){de.classList.remove('no-theme-transitions');},{once:true});}catch(e){}})();</script>
-<link rel=\"stylesheet\" href=\"/ui-static/arcadia_theme.css\">\n
-<!-- Shared application header -->
-<header class=\"tm-header t-header\">\n  <div class=\"tm-container\">\n    <a class=\"tm-brand\" href=\"{{ brand_home_url or '/' }}\">\n      {% if brand_logo_url %}<img src=\"{{ brand_logo_url }}\" alt=\"logo\" style=\"height:22px;vertical-align:middle;margin-right:8px;\"/>{% endif %}\n      {{ brand_name or 'Project Name' }}<small>{{ brand_tag or '' }}</small>\n    </a>\n    <div class=\"tm-right\"> \n      {% set _nav = nav_items if (nav_items is defined) else [] %}\n      {% if _nav and _nav|length > 0 %}\n        <nav class=\"tm-nav\" aria-label=\"Primary\"> \n          {% for it in _nav %}\n            <a href=\"{{ it.href }}\" class=\"tm-link{% if it.active %} active{% endif %}\">{{ it.label }}</a>\n          {% endfor %}\n        </nav>\n      {% endif %}\n      {% if request and request.state and request.state.user %} \n        <div class=\"tm-user\" id=\"tm-user\">\n          <button class=\"tm-user-btn\" id=\"tm-user-btn\">Account ▾</button>\n          <div class=\"tm-user-menu\" id=\"tm-user-menu\">\n            <button class=\"tm-menu-trigger\" id=\"theme-menu-trigger\">Theme</button>\n            <div id=\"theme-submenu\" style=\"display:none; position:absolute; right: 100%; top: 0; z-index: 3000;\"></div>\n            <a href=\"/account\">Account</a>\n            <a href=\"/settings\">Settings</a>\n            <hr />\n            <a href=\"/auth/logout\">Log out</a>\n          </div>\n        </div>\n      {% else %}\n        <div class=\"tm-actions\">\n          <a href=\"/login\" class=\"tm-btn\">Log in</a>\n          <a href=\"/signup\" class=\"tm-btn tm-primary\">Sign up</a>\n        </div>\n      {% endif %}\n    </div>\n  </div>\n</header>
-<!-- Dropdown uses CSS :focus-within; no JS needed -->
-<script src=\"/ui-static/theme-selector.js\"></script>
-<script src=\"/ui-static/contextmenu.js\"></script>
-{% set __persist = persist_header if persist_header is defined else true %}
-{% if __persist %}
-<script src=\"https://unpkg.com/htmx.org@1.9.12\" integrity=\"sha384-+bVsx3b8QdE7cO1S4oFQ9hQ1TImfQxWqS4LzJd8j3jL5uFQw8L7f3NfL2hJdJg9w\" crossorigin=\"anonymous\"></script>
-<script>
-// Enable header persistence via htmx: boost links/forms and swap only #arcadia-content
-(function(){
-  try{
-    var b=document.body; if(!b) return;
-    b.setAttribute('hx-boost','true');
-    b.setAttribute('hx-target','#arcadia-content');
-    b.setAttribute('hx-select','#arcadia-content');
-    b.setAttribute('hx-swap','innerHTML');
-    b.setAttribute('hx-push-url','true');
-  }catch(e){}
-})();
-</script>
-<!-- App-neutral UI re-init event; apps can hook `ui:reinit` to (re)initialize features -->
-<script>
-(function(){
-  try{
-    try{
-      document.body.addEventListener('htmx:beforeSwap', function(){ try{ document.documentElement.classList.add('no-theme-transitions'); }catch{} });
-      document.body.addEventListener('htmx:afterSwap', function(){ try{ document.documentElement.classList.remove('no-theme-transitions'); }catch{} });
-    }catch(e){}
-    function fire(){
-      try{ window.dispatchEvent(new CustomEvent('ui:reinit')); }catch(e){}
-    }
-    if (document.readyState === 'loading') {
-      document.addEventListener('DOMContentLoaded', fire, { once: true });
-    } else {
-      fire();
-    }
-    try{ document.body.addEventListener('htmx:afterSwap', fire); }catch(e){}
-    document.addEventListener('visibilitychange', function(){ if(document.visibilityState==='visible') fire(); });
-  }catch(e){}
-})();
-</script>
-{% endif %}
-        """,
-        encoding="utf-8",
+# Mirrored into a sidecar file so repeat ensure_templates calls can skip
+# reading the header.
+_HEADER_DIGEST = hashlib.sha256(HEADER_BYTES).hexdigest()
+_SENTINEL_BYTES = HEADER_SENTINEL.encode("utf-8")
+
+# Brand link span; the only part of the header that specialization bakes in
+_BRAND_START = HEADER_HTML.index('<a class="tm-brand"')
+_BRAND_END = HEADER_HTML.index("</a>", _BRAND_START) + len("</a>")
+
+
+@functools.lru_cache(maxsize=None)
+def _specialized_header(
+    brand_name: Optional[str],
+    brand_logo_url: Optional[str],
+    brand_home_url: Optional[str],
+    brand_tag: Optional[str],
+) -> Tuple[bytes, str]:
+    """Header with the brand link pre-rendered to static HTML.
+
+    The user menu, nav and htmx blocks stay as Jinja; only the brand
+    conditionals and substitutions are evaluated here, once.
+    """
+    brand = Environment(autoescape=True).from_string(HEADER_HTML[_BRAND_START:_BRAND_END]).render(
+        brand_name=brand_name,
+        brand_logo_url=brand_logo_url,
+        brand_home_url=brand_home_url,
+        brand_tag=brand_tag,
     )
+    if "{" in brand:
+        brand = "{% raw %}" + brand + "{% endraw %}"
+    payload = (HEADER_HTML[:_BRAND_START] + brand + HEADER_HTML[_BRAND_END:]).encode("utf-8")
+    return payload, hashlib.sha256(payload).hexdigest()
+
+
+def _recorded_digest(header: Path, sidecar: Path) -> Optional[str]:
+    """Digest of a header we wrote and nobody touched since, else None."""
+    try:
+        if header.stat().st_mtime_ns > sidecar.stat().st_mtime_ns:
+            return None
+        return sidecar.read_text(encoding="ascii").strip()
+    except (OSError, UnicodeDecodeError):
+        return None
 
 
-def _ensure_theme_assets(sdir: Path) -> None:
+def _write_header(tdir: Path, present: Set[str], payload: bytes = HEADER_BYTES, digest: str = _HEADER_DIGEST) -> None:
+    header = tdir / "_header.html"
+    sidecar = tdir / "_header.html.hash"
+    if "_header.html" in present:
+        has_sidecar = "_header.html.hash" in present
+        recorded = _recorded_digest(header, sidecar) if has_sidecar else None
+        if recorded is not None:
+            # Our own untouched output: only rewrite when the content differs
+            if recorded == digest:
+                return
+        else:
+            try:
+                content: Optional[bytes] = header.read_bytes()
+            except OSError:
+                content = None
+            if content is not None and _SENTINEL_BYTES in content:
+                if has_sidecar:
+                    # Generated, then edited by hand since: leave it alone
+                    return
+                # Generated before digests were recorded: adopt it when it
+                # already matches, otherwise refresh to the requested payload
+                if hashlib.sha256(content).hexdigest() == digest:
+                    sidecar.write_text(digest, encoding="ascii")
+                    return
+    header.write_bytes(payload)
+    sidecar.write_text(digest, encoding="ascii")
+
+
+def _ensure_theme_assets(sdir: Path, present: Set[str]) -> None:
     theme_css = sdir / "arcadia_theme.css"
     regen_theme = False
-    if theme_css.exists():
+    if "arcadia_theme.css" in present:
         try:
             _tc = theme_css.read_text(encoding="utf-8", errors="ignore")
             if "--header-fg" not in _tc or ".theme-light" not in _tc:
@@ -101,94 +129,65 @@ def _ensure_theme_assets(sdir: Path) -> None:
         theme_css.write_text(tm.generate_css(default="light"), encoding="utf-8")
 
 
-def _write_footer(tdir: Path) -> None:
-    footer = tdir / "_footer.html"
-    if not footer.exists():
-        footer.write_text(
-            """<footer style=\"margin-top:auto;padding:12px;border-top:1px solid #eee;color:#888\">© Arcadia</footer>\n""",
-            encoding="utf-8",
-        )
-
-
-def _write_legacy_base_css(sdir: Path) -> None:
-    css = sdir / "arcadia.css"
-    if not css.exists():
-        css.write_text(
-            ("/* LEGACY: Deprecated; use arcadia_theme.css instead. Kept for backward compatibility. */\n"
-             "/* AI Chat-inspired theme */\n"
-             ":root{--bg:#ffffff;--fg:#111;--muted:#666;--border:#e6e6e6;--panel:#f9f9fb;--primary:#1f6feb;--primary-600:#1a64d6;--header-bg:linear-gradient(180deg,#101317 0%,#0f1115 100%);}\n"
-             "body{margin:0;background:var(--bg);color:var(--fg);font-family:system-ui, -apple-system, Segoe UI, Roboto, sans-serif;}\n"
-             "header.ai-header{background:var(--header-bg);color:#fff;box-shadow:0 2px 12px rgba(0,0,0,0.15);position:sticky;top:0;z-index:2000;display:flex;align-items:center;justify-content:space-between;padding:10px 14px;}\n"
-             "a{color:var(--primary);text-decoration:none;}a:hover{text-decoration:underline;}\n"
-             "details.menu{position:relative;display:inline-block;}details.menu[open] summary::after{content:\"\";position:fixed;inset:0;}details.menu>summary::-webkit-details-marker{display:none;}\n"
-             ".menu-button{display:flex;align-items:center;gap:10px;padding:6px 10px;border:1px solid rgba(255,255,255,0.15);border-radius:999px;background:rgba(255,255,255,0.06);backdrop-filter:blur(6px);}\n"
-             ".menu-button .avatar{width:24px;height:24px;border-radius:50%;background:var(--panel);color:var(--fg);display:inline-flex;align-items:center;justify-content:center;font-weight:600;}\n"
-             ".menu-button .label{font-size:13px;color:#fff;opacity:.95;}\n"
-             ".menu-panel{position:absolute;right:0;top:120%;background:var(--panel);border:1px solid var(--border);border-radius:10px;box-shadow:0 6px 18px rgba(0,0,0,0.10);min-width:160px;overflow:visible;color:var(--fg);}\n"
-             ".menu-panel a,.menu-panel form{display:block;padding:8px 10px;margin:0;}\n"
-             ".theme-item{display:flex;align-items:center;gap:8px;width:100%;background:var(--panel);color:var(--fg);border:1px solid var(--border);border-radius:8px;}\n")
-            , encoding="utf-8",
-        )
-
-
-def _write_auth_dialog(tdir: Path) -> None:
-    auth = tdir / "_auth.html"
-    if not auth.exists():
-        auth.write_text(
-            """
-<dialog id=\"authdlg\">\n  <form method=\"dialog\" style=\"min-width:340px\">\n    <h3 style=\"margin:0 0 8px\">Sign in</h3>\n    <div style=\"display:flex;flex-direction:column;gap:8px\">\n      <input id=\"email\" placeholder=\"you@example.com\" />\n      <input id=\"password\" type=\"password\" placeholder=\"password\" />\n      <div style=\"display:flex;gap:8px;justify-content:flex-end\">\n        <button id=\"register\" value=\"register\">Sign up</button>\n        <button id=\"login\" value=\"login\">Login</button>\n        <button value=\"cancel\">Cancel</button>\n      </div>\n    </div>\n  </form>\n</dialog>
-            """,
-            encoding="utf-8",
-        )
-
-
-def _write_login_signup(tdir: Path) -> None:
-    login = tdir / "login.html"
-    signup = tdir / "signup.html"
-    if not login.exists():
-        login.write_text(
-            """<!DOCTYPE html>
-<html lang=\"en\">\n<head>\n    <meta charset=\"UTF-8\">\n    <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">\n    <title>Log in - Arcadia</title>\n    <script src=\"https://cdn.tailwindcss.com\"></script>\n</head>\n<body class=\"bg-gray-100 min-h-screen\" style=\"margin:0;\">\n    {% include \"_header.html\" ignore missing %}\n    <div id=\"arcadia-content\">\n    <div class=\"max-w-md mx-auto mt-12 bg-white shadow p-6 rounded\">\n        <h1 class=\"text-2xl font-semibold mb-4\">Log in</h1>\n        <form id=\"login-form\" class=\"space-y-4\" onsubmit=\"return false;\">\n            <div>\n                <label class=\"block text-sm mb-1\">Email</label>\n                <input id=\"email\" type=\"email\" class=\"w-full border rounded p-2\" required />\n            </div>\n            <div>\n                <label class=\"block text-sm mb-1\">Password</label>\n                <input id=\"password\" type=\"password\" class=\"w-full border rounded p-2\" required />\n            </div>\n            <button id=\"login-btn\" class=\"w-full bg-blue-600 text-white py-2 rounded\">Log in</button>\n            <p id=\"login-error\" class=\"text-sm text-red-600 mt-2\" style=\"display:none;\"></p>\n        </form>\n    </div>\n    <script>\n    function extractErrorMessage(data, fallback) {\n        if (!data) return fallback;\n        const d = data.detail;\n        if (typeof d === 'string') return d;\n        if (Array.isArray(d) && d.length) {\n            const first = d[0] || {};\n            const loc = first.loc || [];\n            if (loc.includes('password')) return 'Password must be at least 8 characters.';\n            if (loc.includes('email')) return 'Please enter a valid email address.';\n            return first.msg || fallback;\n        }\n        return fallback;\n    }\n    document.getElementById('login-btn').addEventListener('click', async () => {\n        const email = (document.getElementById('email').value || '').trim();\n        const password = document.getElementById('password').value || '';\n        const err = document.getElementById('login-error');\n        err.style.display = 'none';\n        try {\n            const res = await fetch('/auth/login', {\n                method: 'POST', headers: {'Content-Type': 'application/json'},\n                body: JSON.stringify({ email, password })\n            });\n            if (!res.ok) {\n                const d = await res.json().catch(()=>null);\n                throw new Error(extractErrorMessage(d, 'Login failed'));\n            }\n            const data = await res.json();\n            try {\n                document.cookie = `access_token=${data.access_token}; Path=/; SameSite=Lax`;\n            } catch {}\n            window.location.href = '/';\n        } catch (e) {\n            err.textContent = e.message || 'Login failed';\n            err.style.display = 'block';\n        }\n    });\n    </script>\n</div>\n</body>\n</html>\n""",
-            encoding="utf-8",
-        )
-    if not signup.exists():
-        signup.write_text(
-            """<!DOCTYPE html>
-<html lang=\"en\">\n<head>\n    <meta charset=\"UTF-8\">\n    <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">\n    <title>Sign up - Arcadia</title>\n    <script src=\"https://cdn.tailwindcss.com\"></script>\n    <style>.hint{font-size:.85rem;color:#6b7280}</style>\n</head>\n<body class=\"bg-gray-100 min-h-screen\" style=\"margin:0;\">\n    {% include \"_header.html\" ignore missing %}\n    <div id=\"arcadia-content\">\n    <div class=\"max-w-md mx-auto mt-12 bg-white shadow p-6 rounded\">\n        <h1 class=\"text-2xl font-semibold mb-4\">Create your account</h1>\n        <form id=\"signup-form\" class=\"space-y-4\" onsubmit=\"return false;\">\n            <div>\n                <label class=\"block text-sm mb-1\">Email</label>\n                <input id=\"email\" type=\"email\" class=\"w-full border rounded p-2\" required />\n            </div>\n            <div>\n                <label class=\"block text-sm mb-1\">Password</label>\n                <input id=\"password\" type=\"password\" class=\"w-full border rounded p-2\" required />\n                <div class=\"hint\">At least 8 characters</div>\n            </div>\n            <button id=\"signup-btn\" class=\"w-full bg-blue-600 text-white py-2 rounded\">Sign up</button>\n            <p id=\"signup-error\" class=\"text-sm text-red-600 mt-2\" style=\"display:none;\"></p>\n        </form>\n    </div>\n    <script>\n    function extractErrorMessage(data, fallback) {\n        if (!data) return fallback;\n        const d = data.detail;\n        if (typeof d === 'string') return d;\n        if (Array.isArray(d) && d.length) {\n            const first = d[0] || {};\n            const loc = first.loc || [];\n            if (loc.includes('password')) return 'Password must be at least 8 characters.';\n            if (loc.includes('email')) return 'Please enter a valid email address.';\n            return first.msg || fallback;\n        }\n        return fallback;\n    }\n    document.getElementById('signup-btn').addEventListener('click', async () => {\n        const email = (document.getElementById('email').value || '').trim();\n        const password = document.getElementById('password').value || '';\n        const err = document.getElementById('signup-error');\n        err.style.display = 'none';\n        try {\n            const res = await fetch('/auth/register', {\n                method: 'POST', headers: {'Content-Type': 'application/json'},\n                body: JSON.stringify({ email, password })\n            });\n            if (!res.ok) {\n                const d = await res.json().catch(()=>null);\n                throw new Error(extractErrorMessage(d, 'Sign up failed'));\n            }\n            const res2 = await fetch('/auth/login', {\n                method: 'POST', headers: {'Content-Type': 'application/json'},\n                body: JSON.stringify({ email, password })\n            });\n            if (!res2.ok) {\n                const d2 = await res2.json().catch(()=>null);\n                throw new Error(extractErrorMessage(d2, 'Login failed'));\n            }\n            const data = await res2.json();\n            try {\n                document.cookie = `access_token=${data.access_token}; Path=/; SameSite=Lax`;\n            } catch {}\n            window.location.href = '/';\n        } catch (e) {\n            err.textContent = e.message || 'Sign up failed';\n            err.style.display = 'block';\n        }\n    });\n    </script>\n    \n</div>\n</body>\n</html>\n""",
-            encoding="utf-8",
-        )
-
-
-def _write_settings_panel(tdir: Path) -> None:
-    settings_panel = tdir / "_settings.html"
-    if not settings_panel.exists():
-        settings_panel.write_text(
-            """
-<div id=\"ui-settings\" data-mode=\"{{ settings_mode or (settings_schema.mode if settings_schema and settings_schema.mode else 'immediate') }}\">\n  {% set schema = (settings_schema or ui_settings_schema) or {} %}\n  {% set fields = schema.fields if schema and schema.fields else [] %}\n  {% set status_id = schema.status_id if schema and schema.status_id else 'ui-settings-status' %}\n  <div id=\"{{ status_id }}\" class=\"ui-settings-status\" style=\"margin:8px 0;color:#555\"></div>\n  <div class=\"ui-settings-body\">\n    {% for f in fields %}\n      <div class=\"ui-field\" data-field=\"{{ f.id }}\" data-save-path=\"{{ f.save_path or schema.save_path or '' }}\" data-save-method=\"{{ f.save_method or schema.save_method or 'POST' }}\" data-group=\"{{ f.group or '' }}\">\n        {% if f.type == 'select' %}\n          <label>{{ f.label }}\n            <select id=\"ui-f-{{ f.id }}\">\n              {% for opt in f.options or [] %}\n                <option value=\"{{ opt.value }}\" {% if opt.value == f.value %}selected{% endif %}>{{ opt.label or opt.value }}</option>\n              {% endfor %}\n            </select>\n          </label>\n        {% elif f.type == 'checkbox' %}\n          <label><input type=\"checkbox\" id=\"ui-f-{{ f.id }}\" {% if f.value %}checked{% endif %}/> {{ f.label }}</label>\n        {% else %}\n          <label>{{ f.label }} <input type=\"text\" id=\"ui-f-{{ f.id }}\" value=\"{{ f.value or '' }}\"/></label>\n        {% endif %}\n      </div>\n    {% endfor %}\n  </div>\n  {% if (settings_mode or (schema.mode if schema and schema.mode else None)) == 'manual' %}\n    <div style=\"margin-top:10px\"><button id=\"ui-settings-save\">Save</button></div>\n  {% endif %}\n</div>\n<script>\n(function(){\n  try{\n    const root=document.getElementById('ui-settings'); if(!root) return;\n    const mode=root.dataset.mode||'immediate';\n    const status=document.getElementById('{{ status_id }}');\n    function setStatus(ok,msg){ if(status){ status.textContent=msg||(ok?'Saved':'Error'); status.style.color=ok?'#055':'#700'; status.style.background=ok?'#e6ffed':'#ffeaea'; status.style.border='1px solid '+(ok?'#b7f5c7':'#ffb3b3'); status.style.padding='6px 8px'; status.style.borderRadius='4px'; }\n      try{ window.dispatchEvent(new CustomEvent('ui-settings-status',{detail:{ok:!!ok,message:msg||''}})); }catch(e){}\n    }\n    function collect(onlyId){ const data={}; const grouped={}; const fields=root.querySelectorAll('.ui-field'); fields.forEach(function(w){ const id=w.getAttribute('data-field'); if(!id|| (onlyId && onlyId!==id)) return; const group=(w.getAttribute('data-group')||'').trim(); const input=w.querySelector('select, input[type=text], input[type=checkbox]'); if(!input) return; let val; if(input.tagName==='SELECT') val=input.value; else if(input.type==='checkbox') val=input.checked; else val=input.value; if(group){ grouped[group]=grouped[group]||{}; grouped[group][id]=val; } else { data[id]=val; } }); for(const k in grouped){ data[k]=grouped[k]; } return data; }\n    async function saveOne(id){ const el=root.querySelector('.ui-field[data-field=\"'+id+'\"]'); if(!el) return; const path=el.getAttribute('data-save-path')||'{{ schema.save_path or '' }}'; const method=el.getAttribute('data-save-method')||'{{ schema.save_method or 'POST' }}'; if(!path){ setStatus(false,'No save_path configured'); return; } const payload=collect(id); try{ const res=await fetch(path,{method:method, headers:{'Content-Type':'application/json'}, body: JSON.stringify(payload)}); const ok=res.ok; let msg= ok?'Saved':'Save failed'; try{ const t=await res.text(); const j=JSON.parse(t); msg=j.detail||(ok?'Saved':'Error'); }catch{} setStatus(ok,msg);}catch(e){ setStatus(false,'Network error'); } }\n    function bind(){ const fields=root.querySelectorAll('.ui-field'); fields.forEach(function(w){ const id=w.getAttribute('data-field'); const input=w.querySelector('select, input[type=text], input[type=checkbox]'); if(!input||!id) return; if(mode==='immediate'){ input.addEventListener('change', function(){ saveOne(id); }); } }); const btn=document.getElementById('ui-settings-save'); if(btn){ btn.addEventListener('click', async function(){ const path='{{ schema.save_path or '' }}'; const method='{{ schema.save_method or 'POST' }}'; if(!path){ setStatus(false,'No save_path configured'); return; } const payload=collect(null); try{ const res=await fetch(path,{method:method, headers:{'Content-Type':'application/json'}, body: JSON.stringify(payload)}); const ok=res.ok; let msg= ok?'Saved':'Save failed'; try{ const t=await res.text(); const j=JSON.parse(t); msg=j.detail||(ok?'Saved':'Error'); }catch{} setStatus(ok,msg);}catch(e){ setStatus(false,'Network error'); } }); } }\n    bind();\n  }catch(e){}\n})();\n</script>
-            """,
-            encoding="utf-8",
-        )
-
-
-def _write_user_menu(tdir: Path) -> None:
-    user_menu_tpl = tdir / "_user_menu.html"
-    if not user_menu_tpl.exists():
-        user_menu_tpl.write_text(
-            """
-<div class=\"tm-user\" id=\"tm-user\">\n  <button class=\"tm-user-btn t-btn\" id=\"tm-user-btn\">Account ▾</button>\n  <div class=\"tm-user-menu t-panel t-border\" id=\"tm-user-menu\">\n    {% set _items = (user_menu_items or []) %}\n    {% for it in _items %}\n      {% if it.divider %}<hr />{% else %}<a class=\"t-fg\" href=\"{{ it.href }}\">{{ it.label }}</a>{% endif %}\n    {% endfor %}\n  </div>\n</div>\n            """,
-            encoding="utf-8",
-        )
-
-
-def ensure_templates(app_dir: str) -> str:
-    """Ensure default templates/static assets and return templates dir path."""
+# Write-once scaffolds: created when missing, never overwritten.
+_TEMPLATE_SCAFFOLDS: Tuple[Tuple[str, bytes], ...] = (
+    ("_footer.html", FOOTER_BYTES),
+    ("_auth.html", AUTH_BYTES),
+    ("login.html", LOGIN_BYTES),
+    ("signup.html", SIGNUP_BYTES),
+    ("_settings.html", SETTINGS_BYTES),
+    ("_user_menu.html", USER_MENU_BYTES),
+)
+_STATIC_SCAFFOLDS: Tuple[Tuple[str, bytes], ...] = (
+    ("arcadia.css", LEGACY_CSS_BYTES),
+)
+
+
+def _missing_scaffolds(d: Path, present: Set[str], scaffolds: Tuple[Tuple[str, bytes], ...]) -> List[Tuple[Path, bytes]]:
+    return [(d / name, payload) for name, payload in scaffolds if name not in present]
+
+
+def ensure_templates(
+    app_dir: str,
+    *,
+    brand_name: Optional[str] = None,
+    brand_logo_url: Optional[str] = None,
+    brand_home_url: Optional[str] = None,
+    brand_tag: Optional[str] = None,
+) -> str:
+    """Ensure default templates/static assets and return templates dir path.
+
+    Passing any brand_* value writes a header specialized to that brand, so
+    renders no longer evaluate the brand block; context values for those
+    names are then ignored.
+    """
     tdir, sdir = _ensure_dirs(app_dir)
-    _write_header(tdir)
-    _ensure_theme_assets(sdir)
-    _write_footer(tdir)
-    _write_legacy_base_css(sdir)
-    _write_auth_dialog(tdir)
-    _write_login_signup(tdir)
-    _write_settings_panel(tdir)
-    _write_user_menu(tdir)
+    present_t = _scan(tdir)
+    present_s = _scan(sdir)
+    if any(v is not None for v in (brand_name, brand_logo_url, brand_home_url, brand_tag)):
+        _write_header(tdir, present_t, *_specialized_header(brand_name, brand_logo_url, brand_home_url, brand_tag))
+    else:
+        _write_header(tdir, present_t)
+    _ensure_theme_assets(sdir, present_s)
+    pending = _missing_scaffolds(tdir, present_t, _TEMPLATE_SCAFFOLDS)
+    pending += _missing_scaffolds(sdir, present_s, _STATIC_SCAFFOLDS)
+    for path, payload in pending:
+        path.write_bytes(payload)
     return str(tdir)
+
+
+@functools.lru_cache(maxsize=None)
+def get_env(app_dir: str) -> Environment:
+    """Return a process-wide Jinja Environment for app_dir/templates.
+
+    Templates are compiled once and never re-stat'ed (auto_reload=False), so
+    call ensure_templates before the first render.
+    """
+    tdir = Path(app_dir) / "templates"
+    return Environment(loader=FileSystemLoader(str(tdir)), auto_reload=False, cache_size=-1)
+
+
+@functools.lru_cache(maxsize=None)
+def get_template(app_dir: str, name: str) -> Template:
+    """Return the compiled template `name` from the cached environment."""
+    return get_env(app_dir).get_template(name)
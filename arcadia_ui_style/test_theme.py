@@ -0,0 +1,25 @@
+from __future__ import annotations
+import json
+import re
+from pathlib import Path
+
+from arcadia_ui_style.theme import ThemeManager
+
+JS = Path(__file__).parent / "arcadia_ui_style" / "static" / "theme-selector.js"
+
+
+def _js_const(name: str):
+    m = re.search(r"^\s*const " + name + r" = (.*);\s*$", JS.read_text(encoding="utf-8"), re.M)
+    assert m, name
+    return json.loads(m.group(1))
+
+
+def test_selector_js_constants_match_theme_manager():
+    tm = ThemeManager()
+    assert _js_const("PRESETS") == {n: tm.get(n).tokens for n in tm.names()}
+    assert _js_const("DISPLAY_NAMES") == {n: tm.get_display_name(n) for n in tm.names()}
+
+
+if __name__ == "__main__":
+    test_selector_js_constants_match_theme_manager()
+    print("arcadia_ui_style theme tests passed")
@@ -6,7 +6,7 @@ from .repo import AuthRepository, InMemoryRepo, MutableAuthRepository
 from .sqlite_repo import SQLiteRepository, create_sqlite_repo
 from .models import Account, create_tables, create_sqlite_engine
 from .router import create_auth_router, AuthSettings
-from .middleware import TokenCookieMiddleware, CookieUserMiddleware, mount_cookie_agent_middleware
+from .middleware import TokenCookieMiddleware, CookieUserMiddleware, RepoSessionMiddleware, mount_cookie_agent_middleware
 from .policy import validate_password
 
 __all__ = [
@@ -15,5 +15,5 @@ __all__ = [
     "AuthRepository", "InMemoryRepo", "MutableAuthRepository", "SQLiteRepository", "create_sqlite_repo",
     "Account", "create_tables", "create_sqlite_engine",
     "create_auth_router", "AuthSettings", "validate_password",
-    "TokenCookieMiddleware", "CookieUserMiddleware", "mount_cookie_agent_middleware",
+    "TokenCookieMiddleware", "CookieUserMiddleware", "RepoSessionMiddleware", "mount_cookie_agent_middleware",
 ]
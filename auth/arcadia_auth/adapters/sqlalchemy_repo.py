@@ -1,17 +1,28 @@
 from __future__ import annotations
 
-from typing import Any, Callable, Optional, Dict, Type
+from contextlib import contextmanager
+from contextvars import ContextVar
+from operator import attrgetter
+from typing import Any, Callable, Iterator, Optional, Dict, Type
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, QueryableAttribute
+from sqlalchemy import bindparam, func, select, update
 
-from ..repo import AuthRepository
+from ..repo import AuthRepository, normalize_email
 
 
 class SQLAlchemyRepo(AuthRepository):
     """Generic SQLAlchemy adapter.
 
     Configure with model classes and field names used by the project.
+
+    Emails are stored lowercased and looked up by plain equality, so the
+    email column should carry a unique index. Databases holding mixed-case
+    rows from older versions should run ``normalize_emails()`` once.
+
+    Each call opens its own session unless one is bound with
+    ``request_session()``; wrap a request in it (see ``RepoSessionMiddleware``)
+    to serve all repo calls of that request from a single session.
     """
 
     def __init__(
@@ -32,6 +43,7 @@ class SQLAlchemyRepo(AuthRepository):
         profile_extras_field: Optional[str] = None,
     ) -> None:
         self._sf = session_factory
+        self._session_ctx: ContextVar[Optional[Session]] = ContextVar(f"arcadia_auth_session_{id(self)}", default=None)
         self.U = UserModel
         self.P = ProfileModel
         self.uf_email = user_email_field
@@ -45,78 +57,169 @@ class SQLAlchemyRepo(AuthRepository):
         self.pf_prefs = profile_prefs_field
         self.pf_extras = profile_extras_field
 
-    # ---- helpers ----
-    def _acc_to_dict(self, u: Any) -> Dict[str, Any]:
-        return {
-            "id": getattr(u, "id"),
-            "email": getattr(u, self.uf_email),
-            "is_active": bool(getattr(u, self.uf_active, True)),
-            "is_verified": bool(getattr(u, self.uf_verified, True)),
-            "role": (getattr(u, self.uf_role) if self.uf_role else None),
-            "subscription_tier": (getattr(u, self.uf_sub) if self.uf_sub else None),
-            "name": getattr(u, "name", None),
-            "extras": None,
-        }
+        # Row readers resolved once; flags the model lacks keep their defaults
+        acc_fields = [("id", "id"), ("email", self.uf_email)]
+        if self.uf_role:
+            acc_fields.append(("role", self.uf_role))
+        if self.uf_sub:
+            acc_fields.append(("subscription_tier", self.uf_sub))
+        for key, attr in (("is_active", self.uf_active), ("is_verified", self.uf_verified), ("name", "name")):
+            if hasattr(UserModel, attr):
+                acc_fields.append((key, attr))
+        self._acc_keys = tuple(k for k, _ in acc_fields)
+        self._acc_get = attrgetter(*(a for _, a in acc_fields))
+        self._acc_cols = self._columns(UserModel, acc_fields)
 
-    def _acc_to_credentials(self, u: Any) -> Dict[str, Any]:
-        return {
-            "id": getattr(u, "id"),
-            "password_hash": getattr(u, self.uf_pwd),
-            "is_active": bool(getattr(u, self.uf_active, True)),
-            "is_verified": bool(getattr(u, self.uf_verified, True)),
-        }
+        cred_fields = [("id", "id"), ("password_hash", self.uf_pwd)]
+        for key, attr in (("is_active", self.uf_active), ("is_verified", self.uf_verified)):
+            if hasattr(UserModel, attr):
+                cred_fields.append((key, attr))
+        self._cred_keys = tuple(k for k, _ in cred_fields)
+        self._cred_get = attrgetter(*(a for _, a in cred_fields))
+        self._cred_cols = self._columns(UserModel, cred_fields)
+        # Flags create_account switches on; probed once rather than per insert
+        self._new_flags = tuple(a for a in (self.uf_active, self.uf_verified) if hasattr(UserModel, a))
 
+        # Lookup statements built once; the bound email keeps their compiled
+        # form in SQLAlchemy's statement cache across calls
+        by_email = getattr(UserModel, self.uf_email) == bindparam("email")
+        self._acc_stmt = select(*(self._acc_cols or (UserModel,))).where(by_email).limit(1)
+        self._cred_stmt = select(*(self._cred_cols or (UserModel,))).where(by_email).limit(1)
+        self._exists_stmt = select(UserModel.id).where(by_email).limit(1)
 
-    # ---- repo API ----
-    def find_account_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+    # ---- sessions ----
+    @contextmanager
+    def request_session(self) -> Iterator[Session]:
+        """Bind one session to the current context for the duration of the block.
+
+        Writes made through the repo are flushed, not committed, while bound;
+        the block commits them on success and rolls back if it raises.
+        """
         s = self._sf()
+        token = self._session_ctx.set(s)
         try:
-            key = email.strip().lower()
-            u = (
-                s.query(self.U)
-                .filter(func.lower(getattr(self.U, self.uf_email)) == key)
-                .first()
-            )
-            return (self._acc_to_dict(u) if u else None)
+            yield s
+            s.commit()
+        except BaseException:
+            s.rollback()
+            raise
         finally:
+            self._session_ctx.reset(token)
             s.close()
 
-    def get_account_credentials(self, email: str) -> Optional[Dict[str, Any]]:
+    @contextmanager
+    def _session(self) -> Iterator[Session]:
+        bound = self._session_ctx.get()
+        if bound is not None:
+            # A failed call must not leave the shared session pending rollback
+            # for the rest of the request
+            try:
+                yield bound
+            except BaseException:
+                bound.rollback()
+                raise
+            return
         s = self._sf()
         try:
-            key = email.strip().lower()
-            u = (
-                s.query(self.U)
-                .filter(func.lower(getattr(self.U, self.uf_email)) == key)
-                .first()
-            )
-            return (self._acc_to_credentials(u) if u else None)
+            yield s
         finally:
             s.close()
 
+    def _commit(self, s: Session) -> None:
+        """Commit a per-call session; a bound request session is only flushed."""
+        if s is self._session_ctx.get():
+            s.flush()
+        else:
+            s.commit()
+
+    # ---- helpers ----
+    @staticmethod
+    def _columns(model: Type[Any], fields: list) -> Optional[tuple]:
+        """Mapped columns for a narrow SELECT, or None if a field is not a column."""
+        cols = tuple(getattr(model, a) for _, a in fields)
+        return cols if all(isinstance(c, QueryableAttribute) for c in cols) else None
+
+    def _acc_to_dict(self, u: Any) -> Dict[str, Any]:
+        return self._acc_from_values(self._acc_get(u))
+
+    def _acc_from_values(self, values: Any) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "id": None,
+            "email": None,
+            "is_active": True,
+            "is_verified": True,
+            "role": None,
+            "subscription_tier": None,
+            "name": None,
+            "extras": None,
+        }
+        out.update(zip(self._acc_keys, values))
+        out["is_active"] = bool(out["is_active"])
+        out["is_verified"] = bool(out["is_verified"])
+        return out
+
+    def _acc_to_credentials(self, u: Any) -> Dict[str, Any]:
+        return self._cred_from_values(self._cred_get(u))
+
+    def _cred_from_values(self, values: Any) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"id": None, "password_hash": None, "is_active": True, "is_verified": True}
+        out.update(zip(self._cred_keys, values))
+        out["is_active"] = bool(out["is_active"])
+        out["is_verified"] = bool(out["is_verified"])
+        return out
+
+
+    # ---- repo API ----
+    def find_account_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        with self._session() as s:
+            row = s.execute(self._acc_stmt, {"email": normalize_email(email)}).first()
+            if row is None:
+                return None
+            # Narrow projection yields plain column tuples; fallback yields (entity,)
+            return self._acc_from_values(row) if self._acc_cols is not None else self._acc_to_dict(row[0])
+
+    def get_account_credentials(self, email: str) -> Optional[Dict[str, Any]]:
+        with self._session() as s:
+            row = s.execute(self._cred_stmt, {"email": normalize_email(email)}).first()
+            if row is None:
+                return None
+            return self._cred_from_values(row) if self._cred_cols is not None else self._acc_to_credentials(row[0])
+
+    def email_exists(self, email: str) -> bool:
+        with self._session() as s:
+            return s.execute(self._exists_stmt, {"email": normalize_email(email)}).first() is not None
+
     def create_account(self, email: str, password_hash: str) -> Dict[str, Any]:
-        s = self._sf()
-        try:
+        with self._session() as s:
             u = self.U()
-            setattr(u, self.uf_email, email.strip().lower())
+            setattr(u, self.uf_email, normalize_email(email))
             setattr(u, self.uf_pwd, password_hash)
-            if hasattr(u, self.uf_active):
-                setattr(u, self.uf_active, True)
-            if hasattr(u, self.uf_verified):
-                setattr(u, self.uf_verified, True)
+            for attr in self._new_flags:
+                setattr(u, attr, True)
             s.add(u)
-            s.commit()
-            s.refresh(u)
-            return self._acc_to_dict(u)
-        finally:
-            s.close()
+            # Flush fills the PK (RETURNING/lastrowid); snapshot before commit
+            # expires the instance, so no refresh SELECT is needed
+            s.flush()
+            out = self._acc_to_dict(u)
+            self._commit(s)
+            return out
 
     def get_account_by_id(self, account_id: str | int) -> Optional[Dict[str, Any]]:
-        s = self._sf()
-        try:
+        with self._session() as s:
             u = s.get(self.U, account_id)
             return (self._acc_to_dict(u) if u else None)
-        finally:
-            s.close()
+
+    def normalize_emails(self) -> int:
+        """Lowercase stored emails in place; returns the number of rows changed."""
+        with self._session() as s:
+            col = getattr(self.U, self.uf_email)
+            res = s.execute(
+                update(self.U)
+                .where(col != func.lower(col))
+                .values({self.uf_email: func.lower(col)})
+                .execution_options(synchronize_session=False)
+            )
+            self._commit(s)
+            return res.rowcount or 0
 
     # Profile management has been removed - applications should implement their own profile systems
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Optional, Sequence, Any
+from typing import Any, Mapping, Optional, Sequence
 
 from .security import decode_token
 
@@ -14,17 +14,27 @@ def parse_bearer_token(authorization: Optional[str]) -> Optional[str]:
     if not authorization:
         return None
     val = authorization.strip()
-    if not val.lower().startswith("bearer "):
+    # Compare the 7-char prefix only; canonical casing skips lower() entirely
+    head = val[:7]
+    if len(val) < 8 or (head != "Bearer " and head.lower() != "bearer "):
         return None
-    return val.split(" ", 1)[1]
+    return val[7:]
 
 
-def extract_subject(token: Optional[str], secret_key: str, algorithms: Sequence[str]) -> Optional[Any]:
+def extract_subject(
+    token: Optional[str],
+    secret_key: str,
+    algorithms: Sequence[str],
+    options: Optional[Mapping[str, Any]] = None,
+) -> Optional[Any]:
     """Decode the token and return the subject claim (sub) when valid.
 
-    Returns None if token is missing or invalid.
+    Returns None if token is missing or invalid. ``options`` is forwarded to
+    ``decode_token`` for required-claim checks.
     """
     if not token:
         return None
-    data = decode_token(token, secret_key, list(algorithms))
+    # Callers pass a prebuilt list/tuple; only copy other iterables
+    algs = algorithms if isinstance(algorithms, (list, tuple)) else list(algorithms)
+    data = decode_token(token, secret_key, algs, options)  # type: ignore[arg-type]
     return (data.get("sub") if data else None)
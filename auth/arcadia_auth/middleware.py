@@ -1,20 +1,74 @@
 from __future__ import annotations
 
-from typing import Any, Callable, Optional, Type
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional, Tuple, Type
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.types import ASGIApp
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from .auth_utils import extract_subject
+from .security import decode_token, on_token_forgotten, token_digest
 
 
-class CookieUserMiddleware(BaseHTTPMiddleware):
+# Required-claim checks run inside the verified decode; shared, never mutated
+_DECODE_OPTIONS = {"require_sub": True, "require_exp": True, "verify_exp": True}
+
+
+# Paths that never need auth context (static assets, probes)
+DEFAULT_SKIP_PREFIXES: Tuple[str, ...] = ("/static/", "/ui-static/", "/assets/", "/favicon.ico", "/healthz")
+
+
+def _read_cookie(scope: Scope, name: str, needle: str) -> Optional[str]:
+    """Pull one cookie out of the raw Cookie header without parsing all of them.
+
+    ``needle`` is ``name + "="``. Falls back to Starlette's parser for the
+    awkward cases (quoted values, repeated names or headers) so results always match
+    ``request.cookies.get(name)``.
+    """
+    raw = None
+    for k, v in scope["headers"]:
+        if k == b"cookie":
+            if raw is not None:
+                # Several Cookie headers are merged, later ones winning
+                return HTTPConnection(scope).cookies.get(name)
+            raw = v.decode("latin-1")
+    if not raw:
+        return None
+    i = raw.find(needle)
+    while i != -1:
+        j = i - 1
+        while j >= 0 and raw[j] in " \t":
+            j -= 1
+        if j < 0 or raw[j] == ";":
+            break
+        i = raw.find(needle, i + 1)
+    if i == -1:
+        # "name =value" style spacing is rare; let the full parser decide
+        return HTTPConnection(scope).cookies.get(name) if name in raw else None
+    start = i + len(needle)
+    end = raw.find(";", start)
+    val = (raw[start:] if end == -1 else raw[start:end]).strip()
+    if val.startswith('"') or (end != -1 and raw.find(name, end) != -1):
+        return HTTPConnection(scope).cookies.get(name)
+    return val
+
+
+class CookieUserMiddleware:
     """Populate request.state.user from a JWT stored in a cookie.
 
     Configure with a session factory and User model so projects can reuse it
     regardless of their ORM setup. The middleware is intentionally light and
-    only sets a "user" attribute for truthy checks in templates.
+    only sets a "user" attribute for truthy checks in templates: a namespace
+    with ``id`` and ``is_active``, not the ORM instance.
+
+    Resolved users are cached per cookie value for ``cache_ttl`` seconds
+    (never past the token's ``exp``) so repeat requests skip the JWT decode
+    and DB lookup; ``cache_ttl=0`` disables this. ``forget_token`` (called by
+    the router's logout) evicts the entry; ``invalidate()`` clears by hand. Requests under
+    ``skip_prefixes`` (static assets by default) are passed through with
+    no user.
     """
 
     def __init__(
@@ -27,45 +81,109 @@ class CookieUserMiddleware(BaseHTTPMiddleware):
         algorithm: str = "HS256",
         cookie_name: str = "access_token",
         require_active_attr: str = "is_active",
+        cache_ttl: float = 60.0,
+        cache_maxsize: int = 10_000,
+        skip_prefixes: Tuple[str, ...] = DEFAULT_SKIP_PREFIXES,
     ) -> None:
-        super().__init__(app)
+        self.app = app
+        # Lookups open and close their own session, so no connection is
+        # held while downstream handlers run
         self._sf = session_factory
         self._U = UserModel
         self._secret = secret_key
-        self._alg = algorithm
+        self._algs = (algorithm,)
+        self._decode_opts = _DECODE_OPTIONS
         self._cookie = cookie_name
+        self._needle = cookie_name + "="
         self._active_attr = require_active_attr
+        # Narrow projection: the middleware only needs id and the active flag
+        self._cols = (
+            (UserModel.id, getattr(UserModel, require_active_attr))
+            if hasattr(UserModel, require_active_attr) else (UserModel.id,)
+        )
+        self._ttl = cache_ttl
+        self._maxsize = cache_maxsize
+        self._skip = tuple(skip_prefixes)
+        # token digest -> (user or None, expires_at); insertion-ordered for eviction
+        self._cache: Dict[bytes, Tuple[Any, float]] = {}
+        on_token_forgotten(self._forget_digest)
+
+    def _forget_digest(self, digest: bytes) -> None:
+        self._cache.pop(digest, None)
+
+    def invalidate(self, token: Optional[str] = None) -> None:
+        """Drop a cached token (e.g. on logout), or the whole cache."""
+        if token is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(token_digest(token), None)
+
+    def _load_user_safe(self, token: str) -> Tuple[Any, Optional[float], bool]:
+        """(user, token exp, cacheable); DB failures never block the request and aren't cached."""
+        try:
+            return (*self._load_user(token), True)
+        except SQLAlchemyError:
+            return None, None, False
 
-    async def dispatch(self, request: Request, call_next):
+    def _load_user(self, token: str) -> Tuple[Any, Optional[float]]:
+        data = decode_token(token, self._secret, self._algs, self._decode_opts)  # type: ignore[arg-type]
+        sub = data.get("sub") if data else None
+        if sub is None:
+            return None, None
+        exp = data.get("exp")
+        exp = float(exp) if isinstance(exp, (int, float)) else None
+        s = self._sf()
         try:
-            request.state.user = None
-            token = request.cookies.get(self._cookie)
-            if token:
-                sub = extract_subject(token, self._secret, [self._alg])
-                if sub is not None:
-                    s = self._sf()
-                    try:
-                        u = s.get(self._U, sub)
-                        if u is not None:
-                            ok = True
-                            if hasattr(u, self._active_attr):
-                                ok = bool(getattr(u, self._active_attr))
-                            if ok:
-                                request.state.user = u
-                    finally:
-                        s.close()
-        except Exception:
-            # never block request flow because of auth context issues
-            request.state.user = None
-        return await call_next(request)
-
-
-class TokenCookieMiddleware(BaseHTTPMiddleware):
+            row = s.query(*self._cols).filter(self._U.id == sub).first()
+            if row is None:
+                return None, exp
+            active = bool(row[1]) if len(row) > 1 else True
+            return (SimpleNamespace(id=row[0], is_active=True) if active else None), exp
+        finally:
+            s.close()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # request.state reads from scope["state"]
+        state = scope.setdefault("state", {})
+        state["user"] = None
+        if self._skip and scope["path"].startswith(self._skip):
+            # Assets never need user context; skip decode and DB work
+            await self.app(scope, receive, send)
+            return
+        token = _read_cookie(scope, self._cookie, self._needle)
+        if token:
+            if self._ttl <= 0:
+                state["user"] = self._load_user_safe(token)[0]
+            else:
+                now = time.monotonic()
+                key = token_digest(token)
+                hit = self._cache.get(key)
+                if hit is not None and hit[1] > now:
+                    state["user"] = hit[0]
+                else:
+                    u, exp, ok = self._load_user_safe(token)
+                    if ok:
+                        if len(self._cache) >= self._maxsize:
+                            self._cache.pop(next(iter(self._cache)), None)
+                        expires = now + self._ttl
+                        if exp is not None:
+                            # Never outlive the token: map its wall-clock exp onto the monotonic clock
+                            expires = min(expires, now + (exp - time.time()))
+                        self._cache[key] = (u, expires)
+                    state["user"] = u
+        await self.app(scope, receive, send)
+
+
+class TokenCookieMiddleware:
     """Lightweight cookie middleware that marks an agent as authenticated if a valid
     JWT cookie is present. It sets request.state.user and request.state.agent to a
     minimal object with an 'id' (account id) so templates can conditionally render.
 
     Does not require a database/session. For full user loading, use CookieUserMiddleware.
+    Requests under ``skip_prefixes`` are passed through without reading the cookie.
     """
 
     def __init__(
@@ -75,33 +193,68 @@ class TokenCookieMiddleware(BaseHTTPMiddleware):
         secret_key: str,
         algorithm: str = "HS256",
         cookie_name: str = "access_token",
+        skip_prefixes: Tuple[str, ...] = DEFAULT_SKIP_PREFIXES,
     ) -> None:
-        super().__init__(app)
+        self.app = app
+        self._skip = tuple(skip_prefixes)
         self._secret = secret_key
-        self._alg = algorithm
+        self._algs = (algorithm,)
+        self._decode_opts = _DECODE_OPTIONS
         self._cookie = cookie_name
+        self._needle = cookie_name + "="
 
-    async def dispatch(self, request: Request, call_next):
-        try:
-            request.state.user = None
-            request.state.agent = None
-            token = request.cookies.get(self._cookie)
-            if token:
-                sub = extract_subject(token, self._secret, [self._alg])
-                if sub is not None:
-                    # Minimal identity object
-                    ident = {"id": sub}
-                    request.state.user = ident
-                    request.state.agent = ident
-        except Exception:
-            request.state.user = None
-            request.state.agent = None
-        return await call_next(request)
-
-
-def mount_cookie_agent_middleware(app: ASGIApp, *, secret_key: str, algorithm: str = "HS256", cookie_name: str = "access_token") -> None:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        state = scope.setdefault("state", {})
+        state["user"] = None
+        state["agent"] = None
+        if self._skip and scope["path"].startswith(self._skip):
+            await self.app(scope, receive, send)
+            return
+        # decode_token maps every JWT failure to None, so no handler is needed
+        token = _read_cookie(scope, self._cookie, self._needle)
+        if token:
+            sub = extract_subject(token, self._secret, self._algs, self._decode_opts)
+            if sub is not None:
+                # Minimal identity object
+                ident = {"id": sub}
+                state["user"] = ident
+                state["agent"] = ident
+        await self.app(scope, receive, send)
+
+
+class RepoSessionMiddleware:
+    """Serve every repository call of a request from one DB session.
+
+    Works with repositories exposing ``request_session()`` (SQLAlchemyRepo,
+    SQLiteRepository); the session is bound to the request context, committed
+    when the request completes and rolled back if it raises.
+    """
+
+    def __init__(self, app: ASGIApp, *, repo: Any) -> None:
+        self.app = app
+        self._repo = repo
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with self._repo.request_session():
+            await self.app(scope, receive, send)
+
+
+def mount_cookie_agent_middleware(
+    app: ASGIApp,
+    *,
+    secret_key: str,
+    algorithm: str = "HS256",
+    cookie_name: str = "access_token",
+    skip_prefixes: Tuple[str, ...] = DEFAULT_SKIP_PREFIXES,
+) -> None:
     try:
         # FastAPI exposes add_middleware
-        app.add_middleware(TokenCookieMiddleware, secret_key=secret_key, algorithm=algorithm, cookie_name=cookie_name)  # type: ignore[attr-defined]
+        app.add_middleware(TokenCookieMiddleware, secret_key=secret_key, algorithm=algorithm, cookie_name=cookie_name, skip_prefixes=skip_prefixes)  # type: ignore[attr-defined]
     except Exception:
         pass
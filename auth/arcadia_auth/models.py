@@ -1,53 +1,77 @@
 from __future__ import annotations
 
-from sqlalchemy import Column, Integer, String, Boolean, Text, JSON, DateTime, create_engine
-from sqlalchemy.ext.declarative import declarative_base
+from datetime import datetime
+from sqlalchemy import String, JSON, DateTime, create_engine, event
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from sqlalchemy.sql import func
 from typing import Optional, Dict, Any
 
-Base = declarative_base()
+
+class Base(DeclarativeBase):
+    pass
+
+
+# Columns exposed through the AuthRepository interface (see Account.to_dict)
+ACCOUNT_PUBLIC_FIELDS = ("id", "email", "is_active", "is_verified", "role", "subscription_tier", "extras")
 
 
 class Account(Base):
     __tablename__ = "accounts"
 
-    id = Column(Integer, primary_key=True)
-    email = Column(String(255), unique=True, nullable=False, index=True)
-    password_hash = Column(String(255), nullable=False)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    email: Mapped[str] = mapped_column(String(255), unique=True, index=True)
+    password_hash: Mapped[str] = mapped_column(String(255))
     
     # Core fields from original schema
-    is_active = Column(Boolean, default=True, nullable=False)
-    is_verified = Column(Boolean, default=True, nullable=False) 
-    role = Column(String(50), nullable=True)  # user|admin|...
-    subscription_tier = Column(String(50), nullable=True)  # free|pro|...
+    is_active: Mapped[bool] = mapped_column(default=True)
+    is_verified: Mapped[bool] = mapped_column(default=True)
+    role: Mapped[Optional[str]] = mapped_column(String(50))  # user|admin|...
+    subscription_tier: Mapped[Optional[str]] = mapped_column(String(50))  # free|pro|...
     
     # Extended fields - apps can add their own here
     # Note: Profile fields (name, timezone, avatar_url) have been removed
     # Applications should implement their own profile systems
     
     # Metadata with JSON fallback for truly flexible data
-    extras = Column(JSON, nullable=True)
+    extras: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON)
     
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), onupdate=func.now())
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dict format expected by AuthRepository interface"""
-        return {
-            "id": self.id,
-            "email": self.email,
-            "is_active": self.is_active,
-            "is_verified": self.is_verified,
-            "role": self.role,
-            "subscription_tier": self.subscription_tier,
-            "extras": self.extras,
-        }
+        # Loaded values sit in __dict__; only expired/unloaded ones need the
+        # instrumented descriptor (which triggers a load)
+        d = self.__dict__
+        return {k: d[k] if k in d else getattr(self, k) for k in ACCOUNT_PUBLIC_FIELDS}
+
+
+# WAL lets readers proceed during a write and, with synchronous=NORMAL, only
+# fsyncs at checkpoints; still crash-safe. In-memory databases ignore WAL.
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-20000",
+)
+
+
+def _set_sqlite_pragmas(dbapi_conn, _record) -> None:
+    cur = dbapi_conn.cursor()
+    try:
+        for pragma in _SQLITE_PRAGMAS:
+            cur.execute(pragma)
+    finally:
+        cur.close()
 
 
 def create_sqlite_engine(database_url: str = "sqlite:///arcadia_auth.db", echo: bool = False):
     """Create SQLite engine with proper configuration"""
     engine = create_engine(database_url, echo=echo, connect_args={"check_same_thread": False})
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
     return engine
 
 
@@ -1,7 +1,15 @@
 from __future__ import annotations
 
 from typing import Optional, Any
-import re
+
+
+_UPPER, _LOWER, _DIGIT, _SPECIAL = 1, 2, 4, 8
+
+# Byte -> character-class bit, used with bytes.translate
+_CLASS_TABLE = bytes(
+    _UPPER if 65 <= i <= 90 else _LOWER if 97 <= i <= 122 else _DIGIT if 48 <= i <= 57 else _SPECIAL
+    for i in range(256)
+)
 
 
 def validate_password(password: str, settings: Any) -> Optional[str]:
@@ -31,12 +39,21 @@ def validate_password(password: str, settings: Any) -> Optional[str]:
         return f"Password must be at least {min_len} characters"
     if isinstance(max_len, int) and max_len > 0 and len(pw) > max_len:
         return f"Password must be at most {max_len} characters"
-    if req_up and not re.search(r"[A-Z]", pw):
-        return "Password must include an uppercase letter"
-    if req_lo and not re.search(r"[a-z]", pw):
-        return "Password must include a lowercase letter"
-    if req_di and not re.search(r"\d", pw):
-        return "Password must include a number"
-    if req_sp and not re.search(r"[^0-9A-Za-z]", pw):
-        return "Password must include a special character"
+    if req_up or req_lo or req_di or req_sp:
+        # Classify every byte in C via translate, then OR the distinct classes;
+        # UTF-8 lead/continuation bytes of non-ASCII chars land in "special"
+        mask = 0
+        for c in set(pw.encode("utf-8", "surrogatepass").translate(_CLASS_TABLE)):
+            mask |= c
+        # Non-ASCII decimals also satisfy \d, as the regex rule did
+        if req_di and not mask & _DIGIT and not pw.isascii() and any(ch.isdecimal() for ch in pw):
+            mask |= _DIGIT
+        if req_up and not mask & _UPPER:
+            return "Password must include an uppercase letter"
+        if req_lo and not mask & _LOWER:
+            return "Password must include a lowercase letter"
+        if req_di and not mask & _DIGIT:
+            return "Password must include a number"
+        if req_sp and not mask & _SPECIAL:
+            return "Password must include a special character"
     return None
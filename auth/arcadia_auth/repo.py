@@ -4,6 +4,15 @@ from abc import ABC, abstractmethod
 from typing import Optional, Dict, Any
 
 
+def normalize_email(email: str) -> str:
+    """Canonical email key: stripped and lowercased.
+
+    str.lower() already takes CPython's ASCII fast path for typical emails;
+    pre-checks (islower) or bytes round-trips measure slower than this.
+    """
+    return email.strip().lower()
+
+
 class AuthRepository(ABC):
     """Abstract repository to be implemented per project/DB.
 
@@ -22,6 +31,10 @@ class AuthRepository(ABC):
     @abstractmethod
     def get_account_by_id(self, account_id: str | int) -> Optional[Dict[str, Any]]: ...
 
+    def email_exists(self, email: str) -> bool:
+        """Membership check for registration; override with an index probe."""
+        return self.find_account_by_email(email) is not None
+
 
 class MutableAuthRepository(AuthRepository, ABC):
     """Optional extension for repositories that support updates.
@@ -34,6 +47,19 @@ class MutableAuthRepository(AuthRepository, ABC):
     def update_account(self, account_id: str | int, **updates) -> Optional[Dict[str, Any]]: ...
 
 
+class _Acc:
+    """Slotted account record for InMemoryRepo; dicts only at the API boundary."""
+
+    __slots__ = ("id", "email", "password_hash", "is_active", "is_verified", "role", "subscription_tier", "extras")
+
+    def __init__(self, **kw: Any) -> None:
+        for k in self.__slots__:
+            setattr(self, k, kw.get(k))
+
+
+_ACC_PUBLIC = tuple(k for k in _Acc.__slots__ if k != "password_hash")
+
+
 class InMemoryRepo(AuthRepository):
     """Simple in-memory store for testing.
 
@@ -42,53 +68,52 @@ class InMemoryRepo(AuthRepository):
 
     def __init__(self) -> None:
         self._acc_id = 0
-        self.accounts: Dict[int, Dict[str, Any]] = {}
+        self.accounts: Dict[int, _Acc] = {}
         self.accounts_by_email: Dict[str, int] = {}
 
     def _next_acc(self) -> int:
         self._acc_id += 1
         return self._acc_id
 
-    def _public_acc(self, acc: Dict[str, Any]) -> Dict[str, Any]:
-        # Return a sanitized copy without password_hash
-        out = {k: v for k, v in acc.items() if k != "password_hash"}
-        return out
+    def _public_acc(self, acc: _Acc) -> Dict[str, Any]:
+        # Return a sanitized dict without password_hash
+        return {k: getattr(acc, k) for k in _ACC_PUBLIC}
 
     def find_account_by_email(self, email: str) -> Optional[Dict[str, Any]]:
-        key = email.strip().lower()
-        acc_id = self.accounts_by_email.get(key)
-        acc = self.accounts.get(acc_id) if acc_id else None
-        return (self._public_acc(acc) if acc else None)
+        try:
+            acc = self.accounts[self.accounts_by_email[normalize_email(email)]]
+        except KeyError:
+            return None
+        return self._public_acc(acc)
 
     def get_account_credentials(self, email: str) -> Optional[Dict[str, Any]]:
-        key = email.strip().lower()
-        acc_id = self.accounts_by_email.get(key)
-        acc = self.accounts.get(acc_id) if acc_id else None
-        if not acc:
+        try:
+            acc = self.accounts[self.accounts_by_email[normalize_email(email)]]
+        except KeyError:
             return None
         return {
-            "id": acc["id"],
-            "password_hash": acc.get("password_hash", ""),
-            "is_active": bool(acc.get("is_active", True)),
-            "is_verified": bool(acc.get("is_verified", True)),
+            "id": acc.id,
+            "password_hash": acc.password_hash or "",
+            "is_active": bool(acc.is_active),
+            "is_verified": bool(acc.is_verified),
         }
 
+    def email_exists(self, email: str) -> bool:
+        return normalize_email(email) in self.accounts_by_email
+
     def create_account(self, email: str, password_hash: str) -> Dict[str, Any]:
-        if self.find_account_by_email(email):
+        if self.email_exists(email):
             raise ValueError("email already registered")
         aid = self._next_acc()
-        acc = {
-            "id": aid,
-            "email": email.strip().lower(),
-            "password_hash": password_hash,
-            "is_active": True,
-            "is_verified": True,
-            "role": None,
-            "subscription_tier": None,
-            "extras": None,
-        }
+        acc = _Acc(
+            id=aid,
+            email=normalize_email(email),
+            password_hash=password_hash,
+            is_active=True,
+            is_verified=True,
+        )
         self.accounts[aid] = acc
-        self.accounts_by_email[acc["email"]] = aid
+        self.accounts_by_email[acc.email] = aid
         return self._public_acc(acc)
 
     def get_account_by_id(self, account_id: int) -> Optional[Dict[str, Any]]:
@@ -6,9 +6,9 @@ from dataclasses import dataclass
 from fastapi import APIRouter, Depends, HTTPException, Header, status, Request, Cookie
 
 from .schemas import AccountCreate, AccountOut, LoginIn, TokenOut
-from .security import hash_password, verify_password, create_access_token
+from .security import hash_password, verify_password, create_access_token, forget_token
 from .auth_utils import parse_bearer_token, extract_subject
-from .repo import AuthRepository
+from .repo import AuthRepository, normalize_email
 from .policy import validate_password
 
 
@@ -26,24 +26,13 @@ class AuthSettings:
     require_special: bool = False  # non-alnum
 
 
-def _auth_header(
-    request: Request,
+async def _auth_header(
     authorization: Optional[str] = Header(default=None, alias="Authorization"),
     access_token: Optional[str] = Cookie(default=None),
 ) -> Optional[str]:
     # Prefer Bearer token from Authorization; fallback to access_token cookie
-    token = parse_bearer_token(authorization)
-    if token:
-        return token
-    if access_token:
-        return access_token
-    try:
-        ck = request.cookies.get("access_token")
-        if ck:
-            return ck
-    except Exception:
-        pass
-    return None
+    # (Cookie() reads the same parsed jar as request.cookies)
+    return parse_bearer_token(authorization) or access_token or None
 
 
 def create_auth_router(
@@ -55,6 +44,8 @@ def create_auth_router(
     r = APIRouter(prefix="/auth", tags=["auth"])
 
     def _to_account_out(acc: dict[str, Any]) -> AccountOut:
+        # pydantic-core validates a flat dict faster than either
+        # model_construct or model_copy(update=...) off a template instance
         return AccountPublic.model_validate({
             "id": acc.get("id"),
             "email": acc.get("email"),
@@ -67,8 +58,8 @@ def create_auth_router(
 
     @r.post("/register", response_model=AccountOut, status_code=status.HTTP_201_CREATED)
     def register(payload: AccountCreate):
-        email = payload.email.strip().lower()
-        if repo.find_account_by_email(email):
+        email = normalize_email(payload.email)
+        if repo.email_exists(email):
             raise HTTPException(status_code=409, detail="Email already registered")
         # Validate password policy; None means OK
         msg = validate_password(payload.password, settings)
@@ -79,7 +70,11 @@ def create_auth_router(
 
     @r.post("/login", response_model=TokenOut)
     def login(payload: LoginIn):
-        email = payload.email.strip().lower()
+        # Bound KDF input: no valid password exceeds the policy maximum
+        max_len = settings.pwd_max_len
+        if max_len and max_len > 0 and len(payload.password) > max_len:
+            raise HTTPException(status_code=422, detail=f"Password must be at most {max_len} characters")
+        email = normalize_email(payload.email)
         creds = repo.get_account_credentials(email)
         if not creds or not verify_password(payload.password, creds.get("password_hash", "")):
             raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -89,8 +84,10 @@ def create_auth_router(
         return TokenOut(access_token=token)
 
     @r.get("/logout")
-    def logout():
+    def logout(token: Optional[str] = Depends(_auth_header)):
         from fastapi.responses import RedirectResponse
+        if token:
+            forget_token(token)
         resp = RedirectResponse(url="/", status_code=302)
         try:
             resp.delete_cookie("access_token", path="/")
@@ -98,14 +95,36 @@ def create_auth_router(
             pass
         return resp
 
-    @r.get("/me", response_model=AccountOut)
-    def me(authorization: Optional[str] = Depends(_auth_header)):
-        if not authorization:
+    # Bound once per router: the subject check runs on every authenticated request
+    algorithms = (settings.algorithm,)
+    secret_key = settings.secret_key
+
+    async def _require_sub(request: Request, token: Optional[str] = Depends(_auth_header)) -> Any:
+        # Decode once per request; later dependents reuse the stored subject
+        cached = getattr(request.state, "_auth_sub", None)
+        if cached is not None:
+            return cached
+        if not token:
             raise HTTPException(status_code=401, detail="Not authenticated")
-        sub = extract_subject(authorization, settings.secret_key, [settings.algorithm])
+        sub = extract_subject(token, secret_key, algorithms)
         if sub is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-        acc = repo.get_account_by_id(sub)  # type: ignore[arg-type]
+        request.state._auth_sub = sub
+        return sub
+
+    def _get_account_cached(request: Request, sub: Any) -> Optional[dict[str, Any]]:
+        # Per-request memo so stacked dependencies/hooks share one repo fetch
+        cache = getattr(request.state, "_acc_cache", None)
+        if cache is None:
+            cache = {}
+            request.state._acc_cache = cache
+        if sub not in cache:
+            cache[sub] = repo.get_account_by_id(sub)  # type: ignore[arg-type]
+        return cache[sub]
+
+    @r.get("/me", response_model=AccountOut)
+    def me(request: Request, sub: Any = Depends(_require_sub)):
+        acc = _get_account_cached(request, sub)
         if not acc:
             raise HTTPException(status_code=401, detail="User not found")
         return _to_account_out(acc)
@@ -1,13 +1,39 @@
 from __future__ import annotations
 
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Callable, List, Mapping, Optional, Tuple
 
 from jose import jwt, JWTError
+from jose.utils import base64url_decode, base64url_encode, is_pem_format, is_ssh_key
 from passlib.context import CryptContext
 
 
+try:  # optional: direct argon2-cffi calls skip passlib's per-call dispatch
+    from argon2 import PasswordHasher as _PasswordHasher  # type: ignore
+    from argon2.exceptions import InvalidHashError as _InvalidHashError, VerificationError as _VerificationError  # type: ignore
+
+    _ph: Optional[Any] = _PasswordHasher()
+except Exception:  # pragma: no cover - backend not installed
+    _ph = None
+
+try:  # optional: faster JSON encoding of the token payload
+    import orjson as _orjson  # type: ignore
+except Exception:  # pragma: no cover - not installed
+    _orjson = None
+
+
 def _argon2_available() -> bool:
+    if _ph is not None:
+        return True
     try:
         # Prefer passlib's detection; returns False if backend missing
         from passlib.handlers.argon2 import argon2  # type: ignore
@@ -30,6 +56,9 @@ def _build_pwd_context() -> CryptContext:
 
 # Password hashing context: prefer argon2id when available, fallback to PBKDF2
 pwd_context = _build_pwd_context()
+# The built-in context is handled by the direct KDF calls below; a context
+# installed via set_password_context() is always honoured as-is
+_default_context = pwd_context
 
 
 def set_password_context(context: CryptContext) -> None:
@@ -38,12 +67,36 @@ def set_password_context(context: CryptContext) -> None:
     pwd_context = context
 
 
+def _ab64_decode(data: str) -> bytes:
+    # passlib's adapted base64: "." instead of "+", padding stripped
+    data = data.replace(".", "+")
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def _verify_pbkdf2_sha256(plain_password: str, password_hash: str) -> bool:
+    # $pbkdf2-sha256$<rounds>$<salt>$<checksum>
+    _, _, rounds, salt, checksum = password_hash.split("$")
+    expected = _ab64_decode(checksum)
+    derived = hashlib.pbkdf2_hmac("sha256", plain_password.encode("utf-8"), _ab64_decode(salt), int(rounds), len(expected))
+    return hmac.compare_digest(derived, expected)
+
+
 def hash_password(password: str) -> str:
+    if _ph is not None and pwd_context is _default_context:
+        return _ph.hash(password)
     return pwd_context.hash(password)
 
 
 def verify_password(plain_password: str, password_hash: str) -> bool:
     try:
+        if pwd_context is _default_context:
+            if _ph is not None and password_hash.startswith("$argon2"):
+                try:
+                    return _ph.verify(password_hash, plain_password)
+                except (_VerificationError, _InvalidHashError):
+                    return False
+            if password_hash.startswith("$pbkdf2-sha256$"):
+                return _verify_pbkdf2_sha256(plain_password, password_hash)
         return pwd_context.verify(plain_password, password_hash)
     except Exception:
         return False
@@ -53,11 +106,196 @@ def create_access_token(subject: str | int, secret_key: str, algorithm: str = "H
     now = datetime.now(timezone.utc)
     exp = now + timedelta(minutes=expires_minutes)
     payload = {"sub": str(subject), "iat": int(now.timestamp()), "exp": int(exp.timestamp())}
+    mac = _hs256_mac(secret_key) if algorithm == "HS256" else None
+    if mac is not None:
+        return _encode_hs256(payload, mac)
     return jwt.encode(payload, secret_key, algorithm=algorithm)
 
 
-def decode_token(token: str, secret_key: str, algorithms: list[str] = ["HS256"]) -> Optional[dict]:
+# HS256 fast path. Tokens minted here (fixed header, sub/iat/exp claims) are
+# signed and verified with hashlib/hmac directly; anything else (other
+# headers or algorithms, aud/nbf/iss/... claims, unusual options or keys)
+# goes through python-jose, whose checks the fast path mirrors exactly.
+_HS256_HEADER = base64url_encode(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":"), sort_keys=True).encode("utf-8"))
+_FAST_OPTIONS = frozenset({"require_sub", "require_exp", "require_iat", "verify_sub", "verify_exp", "verify_iat", "leeway"})
+_JOSE_ONLY_CLAIMS = ("nbf", "aud", "iss", "jti", "at_hash")
+_FALLBACK = object()
+
+
+@lru_cache(maxsize=32)
+def _hs256_mac(secret_key: Any) -> Optional["hmac.HMAC"]:
+    """Keyed HMAC-SHA256 template (key as jose derives it), or None to defer to jose.
+
+    Callers ``copy()`` it, so the key padding is computed once per secret.
+    """
+    if not isinstance(secret_key, str):
+        return None
+    try:
+        # jose accepts JSON-encoded keys/JWK sets in place of a raw secret
+        loaded = json.loads(secret_key, parse_int=str, parse_float=str)
+    except Exception:
+        loaded = secret_key
+    if not isinstance(loaded, str):
+        return None
+    key = loaded.encode("utf-8")
+    if is_pem_format(key) or is_ssh_key(key):
+        return None
+    return hmac.new(key, digestmod=hashlib.sha256)
+
+
+def _sign(mac: "hmac.HMAC", signing_input: bytes) -> bytes:
+    h = mac.copy()
+    h.update(signing_input)
+    return h.digest()
+
+
+def _encode_hs256(payload: Mapping[str, Any], mac: "hmac.HMAC") -> str:
+    # orjson emits the same compact bytes as json.dumps for str/int claims
+    body = _orjson.dumps(payload) if _orjson is not None else json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    signing_input = _HS256_HEADER + b"." + base64url_encode(body)
+    return (signing_input + b"." + base64url_encode(_sign(mac, signing_input))).decode("utf-8")
+
+
+def _decode_hs256(token: str, mac: "hmac.HMAC", options: Optional[Mapping[str, Any]]) -> Any:
+    """Verified claims, None if jose would reject the token, or _FALLBACK."""
+    opts = options or {}
+    if not _FAST_OPTIONS.issuperset(opts):
+        return _FALLBACK
+    leeway = opts.get("leeway", 0)
+    if not isinstance(leeway, (int, float)):
+        return _FALLBACK
+    raw = token.encode("utf-8")
+    try:
+        signing_input, crypto_segment = raw.rsplit(b".", 1)
+        header_segment, claims_segment = signing_input.split(b".", 1)
+    except ValueError:
+        return None
+    if header_segment != _HS256_HEADER:
+        return _FALLBACK
     try:
-        return jwt.decode(token, secret_key, algorithms=algorithms)
-    except JWTError:
+        payload = base64url_decode(claims_segment)
+        signature = base64url_decode(crypto_segment)
+    except (TypeError, ValueError):
         return None
+    if not hmac.compare_digest(signature, _sign(mac, signing_input)):
+        return None
+    try:
+        claims = json.loads(payload.decode("utf-8"))
+    except ValueError:
+        return None
+    if not isinstance(claims, dict):
+        return None
+    if any(c in claims for c in _JOSE_ONLY_CLAIMS):
+        return _FALLBACK
+    verify = {}
+    for c in ("sub", "exp", "iat"):
+        verify[c] = opts.get("verify_" + c, True)
+        if opts.get("require_" + c):
+            if c not in claims:
+                return None
+            verify[c] = True
+    for c in ("iat", "exp"):
+        if verify[c] and c in claims and not isinstance(claims[c], int):
+            return _FALLBACK
+    if verify["exp"] and "exp" in claims and claims["exp"] < int(time.time()) - leeway:
+        return None
+    if verify["sub"] and "sub" in claims and not isinstance(claims["sub"], str):
+        return None
+    return claims
+
+
+# Verified claims keyed by (token digest, secret, algorithms, options). Entries live
+# for a short TTL, capped by the token's own exp, so a repeated cookie skips
+# the signature check. Only a digest of the token is retained. Sync routes run
+# in a threadpool, so reads and evictions go through one lock.
+_DECODE_CACHE_MAX = 4096
+_DECODE_CACHE_TTL = 5.0
+_decode_cache: "OrderedDict[Tuple[bytes, str, Tuple[str, ...], Optional[frozenset]], Tuple[dict, float]]" = OrderedDict()
+_decode_lock = threading.Lock()
+
+
+def token_digest(token: str) -> bytes:
+    """Short stable digest used to key caches without holding the raw token."""
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+
+def _prune_decode_cache(now: float) -> None:
+    for k in [k for k, (_, exp) in _decode_cache.items() if exp <= now]:
+        del _decode_cache[k]
+    while len(_decode_cache) >= _DECODE_CACHE_MAX:
+        _decode_cache.popitem(last=False)
+
+
+def decode_token(
+    token: str,
+    secret_key: str,
+    algorithms: list[str] = ["HS256"],
+    options: Optional[Mapping[str, Any]] = None,
+) -> Optional[dict]:
+    """Verify and decode a JWT, returning its claims or None.
+
+    ``options`` is passed to ``jose.jwt.decode`` (e.g. ``{"require_exp": True}``)
+    so required-claim checks happen inside the single verified decode.
+    """
+    try:
+        key: Optional[tuple] = (token_digest(token), secret_key, tuple(algorithms), frozenset(options.items()) if options else None)
+        hash(key)
+    except TypeError:
+        # Unhashable option values (jose accepts e.g. lists) or key: decode uncached
+        key = None
+    now = time.time()
+    if key is not None:
+        with _decode_lock:
+            hit = _decode_cache.get(key)
+            if hit is not None:
+                if hit[1] > now:
+                    _decode_cache.move_to_end(key)
+                    return dict(hit[0])
+                del _decode_cache[key]
+    data: Any = _FALLBACK
+    if "HS256" in algorithms:
+        mac = _hs256_mac(secret_key)
+        if mac is not None:
+            data = _decode_hs256(token, mac, options)
+            if data is None:
+                return None
+    if data is _FALLBACK:
+        try:
+            data = jwt.decode(token, secret_key, algorithms=algorithms, options=dict(options) if options else None)
+        except JWTError:
+            return None
+    if key is None:
+        return dict(data)
+    exp = data.get("exp")
+    expires = now + _DECODE_CACHE_TTL
+    if isinstance(exp, (int, float)):
+        expires = min(expires, float(exp))
+    with _decode_lock:
+        if len(_decode_cache) >= _DECODE_CACHE_MAX:
+            _prune_decode_cache(now)
+        _decode_cache[key] = (data, expires)
+    return dict(data)
+
+
+# Other token caches (e.g. CookieUserMiddleware) hook in here so logout
+# evicts them too; bound methods are held weakly
+_forget_hooks: List[Any] = []
+
+
+def on_token_forgotten(callback: Callable[[bytes], None]) -> None:
+    """Call ``callback(token_digest)`` whenever ``forget_token`` runs."""
+    ref = weakref.WeakMethod(callback) if hasattr(callback, "__self__") else (lambda cb=callback: cb)
+    with _decode_lock:
+        _forget_hooks.append(ref)
+
+
+def forget_token(token: str) -> None:
+    """Drop any cached verification of ``token`` (e.g. on logout)."""
+    digest = token_digest(token)
+    with _decode_lock:
+        for k in [k for k in _decode_cache if k[0] == digest]:
+            del _decode_cache[k]
+        callbacks = [cb for cb in (ref() for ref in _forget_hooks) if cb is not None]
+        _forget_hooks[:] = [ref for ref in _forget_hooks if ref() is not None]
+    for cb in callbacks:
+        cb(digest)
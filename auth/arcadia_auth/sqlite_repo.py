@@ -1,13 +1,35 @@
 from __future__ import annotations
 
-from typing import Optional, Dict, Any
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Dict, Any
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import Session, sessionmaker
-from .repo import MutableAuthRepository
-from .models import Account, create_sqlite_engine, create_tables
+from .repo import MutableAuthRepository, normalize_email
+from .models import ACCOUNT_PUBLIC_FIELDS, Account, create_sqlite_engine, create_tables
+
+
+# Read paths select only the columns they return; timestamps and the
+# password hash are never materialized for public views. Emails are stored
+# lower-cased, so lookups are plain equality on the unique email index.
+_PUBLIC_COLS = tuple(getattr(Account, k) for k in ACCOUNT_PUBLIC_FIELDS)
+_CRED_COLS = (Account.id, Account.password_hash, Account.is_active, Account.is_verified)
+# Hot lookups are prebuilt Core selects, reused (and compile-cached) per call
+_BY_EMAIL = Account.email == bindparam("email")
+_CRED_STMT = select(*_CRED_COLS).where(_BY_EMAIL).limit(1)
+_PUBLIC_BY_EMAIL_STMT = select(*_PUBLIC_COLS).where(_BY_EMAIL).limit(1)
+_PUBLIC_BY_ID_STMT = select(*_PUBLIC_COLS).where(Account.id == bindparam("id"))
+_EXISTS_STMT = select(Account.id).where(_BY_EMAIL).limit(1)
+_COLUMN_KEYS = frozenset(Account.__mapper__.columns.keys())
 
 
 class SQLiteRepository(MutableAuthRepository):
-    """SQLite implementation of AuthRepository with extensible schema support."""
+    """SQLite implementation of AuthRepository with extensible schema support.
+
+    Each call opens its own session unless one is bound with
+    ``request_session()`` (see ``RepoSessionMiddleware``).
+    """
     
     def __init__(self, database_url: str = "sqlite:///arcadia_auth.db", echo: bool = False):
         """Initialize SQLite repository.
@@ -19,78 +41,155 @@ class SQLiteRepository(MutableAuthRepository):
         self.engine = create_sqlite_engine(database_url, echo)
         create_tables(self.engine)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self._session_ctx: ContextVar[Optional[Session]] = ContextVar(f"sqlite_repo_session_{id(self)}", default=None)
+        # INSERT/UPDATE .. RETURNING need SQLite 3.35+; the dialect reads the
+        # linked library's version, which older Python builds may predate
+        self._insert_returning = self.engine.dialect.insert_returning
+        self._update_returning = self.engine.dialect.update_returning
     
     def _get_session(self) -> Session:
         """Get a new database session"""
         return self.SessionLocal()
+
+    @contextmanager
+    def request_session(self) -> Iterator[Session]:
+        """Bind one session to the current context for the duration of the block.
+
+        Writes are flushed, not committed, while bound; the block commits
+        them on success and rolls back if it raises.
+        """
+        session = self._get_session()
+        token = self._session_ctx.set(session)
+        try:
+            yield session
+            session.commit()
+        except BaseException:
+            session.rollback()
+            raise
+        finally:
+            self._session_ctx.reset(token)
+            session.close()
+
+    @contextmanager
+    def _session(self) -> Iterator[Session]:
+        """The bound request session, or a fresh one closed on exit"""
+        bound = self._session_ctx.get()
+        if bound is not None:
+            # Keep the shared session usable for the rest of the request
+            try:
+                yield bound
+            except BaseException:
+                bound.rollback()
+                raise
+            return
+        with self._get_session() as session:
+            yield session
+
+    def _commit(self, session: Session) -> None:
+        """Commit a per-call session; a bound request session is only flushed"""
+        if session is self._session_ctx.get():
+            session.flush()
+        else:
+            session.commit()
     
     def find_account_by_email(self, email: str) -> Optional[Dict[str, Any]]:
-        """Find account by email (case-insensitive)"""
-        with self._get_session() as session:
-            account = session.query(Account).filter(
-                Account.email.ilike(email.strip().lower())
-            ).first()
-            return account.to_dict() if account else None
+        """Find account by email (normalized, indexed equality)"""
+        with self._session() as session:
+            row = session.execute(_PUBLIC_BY_EMAIL_STMT, {"email": normalize_email(email)}).first()
+            return dict(zip(ACCOUNT_PUBLIC_FIELDS, row)) if row else None
 
     def get_account_credentials(self, email: str) -> Optional[Dict[str, Any]]:
         """Retrieve credentials-only view for login path"""
-        with self._get_session() as session:
-            account = session.query(Account).filter(
-                Account.email.ilike(email.strip().lower())
-            ).first()
-            if not account:
+        with self._session() as session:
+            row = session.execute(_CRED_STMT, {"email": normalize_email(email)}).first()
+            if not row:
                 return None
             return {
-                "id": account.id,
-                "password_hash": account.password_hash,
-                "is_active": bool(account.is_active),
-                "is_verified": bool(account.is_verified),
+                "id": row[0],
+                "password_hash": row[1],
+                "is_active": bool(row[2]),
+                "is_verified": bool(row[3]),
             }
     
+    def email_exists(self, email: str) -> bool:
+        """Check for a registered email without loading the row"""
+        with self._session() as session:
+            return session.execute(_EXISTS_STMT, {"email": normalize_email(email)}).first() is not None
+
     def create_account(self, email: str, password_hash: str, **extra_fields) -> Dict[str, Any]:
         """Create a new account with optional extended fields"""
-        with self._get_session() as session:
-            # Check if email already exists
-            existing = session.query(Account).filter(
-                Account.email.ilike(email.strip().lower())
+        # Reject unknown fields up front, as the Account constructor would
+        for key in extra_fields:
+            if key not in _COLUMN_KEYS:
+                raise TypeError(f"{key!r} is an invalid keyword argument for Account")
+        email = normalize_email(email)
+        with self._session() as session:
+            if not self._insert_returning:
+                if session.execute(_EXISTS_STMT, {"email": email}).first() is not None:
+                    raise ValueError("email already registered")
+                account = Account(email=email, password_hash=password_hash, **extra_fields)
+                session.add(account)
+                session.flush()
+                out = account.to_dict()
+                self._commit(session)
+                return out
+            # Single round-trip insert; the unique email index decides
+            # duplicates, so there is no check-then-insert race
+            row = session.execute(
+                insert(Account)
+                .values(email=email, password_hash=password_hash, **extra_fields)
+                .on_conflict_do_nothing(index_elements=[Account.email])
+                .returning(*_PUBLIC_COLS)
             ).first()
-            if existing:
+            if row is None:
                 raise ValueError("email already registered")
-
-            # Create account with extended fields
-            account = Account(
-                email=email.strip().lower(),
-                password_hash=password_hash,
-                **extra_fields  # Allow arbitrary extra fields from apps
-            )
-
-            session.add(account)
-            session.commit()
-            session.refresh(account)
-
-            return account.to_dict()
+            self._commit(session)
+            return dict(zip(ACCOUNT_PUBLIC_FIELDS, row))
     
     def get_account_by_id(self, account_id: str | int) -> Optional[Dict[str, Any]]:
         """Get account by ID"""
-        with self._get_session() as session:
-            account = session.query(Account).filter(Account.id == int(account_id)).first()
-            return account.to_dict() if account else None
+        with self._session() as session:
+            row = session.execute(_PUBLIC_BY_ID_STMT, {"id": int(account_id)}).first()
+            return dict(zip(ACCOUNT_PUBLIC_FIELDS, row)) if row else None
     
     def update_account(self, account_id: str | int, **updates) -> Optional[Dict[str, Any]]:
         """Update account with extended field support"""
-        with self._get_session() as session:
-            account = session.query(Account).filter(Account.id == int(account_id)).first()
-            if not account:
-                return None
-            
-            # Update fields that exist on the model
-            for field, value in updates.items():
-                if hasattr(account, field):
-                    setattr(account, field, value)
-            
-            session.commit()
-            session.refresh(account)
-            return account.to_dict()
+        # Only mapped columns are writable; unknown keys are ignored
+        values = {k: v for k, v in updates.items() if k in _COLUMN_KEYS}
+        with self._session() as session:
+            if not values:
+                row = session.execute(_PUBLIC_BY_ID_STMT, {"id": int(account_id)}).first()
+                return dict(zip(ACCOUNT_PUBLIC_FIELDS, row)) if row else None
+            stmt = (
+                update(Account)
+                .where(Account.id == int(account_id))
+                .values(values)
+                .execution_options(synchronize_session=False)
+            )
+            if self._update_returning:
+                # One UPDATE .. RETURNING instead of load, mutate, flush
+                row = session.execute(stmt.returning(*_PUBLIC_COLS)).first()
+            else:
+                session.execute(stmt)
+                row = session.execute(_PUBLIC_BY_ID_STMT, {"id": int(account_id)}).first()
+            self._commit(session)
+            return dict(zip(ACCOUNT_PUBLIC_FIELDS, row)) if row else None
+
+    def normalize_emails(self) -> int:
+        """Lowercase stored emails in place; returns the number of rows changed.
+
+        Run once on databases written before emails were normalized, since
+        lookups no longer fold case.
+        """
+        with self._session() as session:
+            res = session.execute(
+                update(Account)
+                .where(Account.email != func.lower(Account.email))
+                .values(email=func.lower(Account.email))
+                .execution_options(synchronize_session=False)
+            )
+            self._commit(session)
+            return res.rowcount or 0
 
 
 # Convenience function for easy instantiation
@@ -0,0 +1,184 @@
+from __future__ import annotations
+import os
+import tempfile
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.requests import HTTPConnection
+
+from arcadia_auth import Account, CookieUserMiddleware, SQLiteRepository, create_access_token
+from arcadia_auth.adapters import SQLAlchemyRepo
+from arcadia_auth.middleware import _read_cookie
+from arcadia_auth.models import Base
+from arcadia_auth.security import forget_token
+
+SECRET = "test-secret"
+
+
+def _session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    SF = sessionmaker(bind=engine)
+    with SF() as s:
+        s.add(Account(id=1, email="a@example.com", password_hash="x"))
+        s.commit()
+    return SF
+
+
+def _app(session_factory=None, **kw):
+    app = FastAPI()
+    app.add_middleware(
+        CookieUserMiddleware,
+        session_factory=session_factory or _session_factory(),
+        UserModel=Account,
+        secret_key=SECRET,
+        **kw,
+    )
+
+    @app.get("/me")
+    def me(request: Request):
+        u = request.state.user
+        return {"id": u.id if u else None}
+
+    return app
+
+
+def test_cached_user_expires_with_token():
+    c = TestClient(_app(cache_ttl=60))
+    exp = int(time.time()) + 1
+    c.cookies.set("access_token", jwt.encode({"sub": "1", "exp": exp}, SECRET, algorithm="HS256"))
+    assert c.get("/me").json() == {"id": 1}
+    # jose compares whole seconds: the token is rejected once now > exp
+    time.sleep(max(0.0, exp + 1.05 - time.time()))
+    assert c.get("/me").json() == {"id": None}
+
+
+def test_forget_token_evicts_cached_user():
+    c = TestClient(_app(cache_ttl=60))
+    tok = create_access_token(1, SECRET)
+    c.cookies.set("access_token", tok)
+    assert c.get("/me").json() == {"id": 1}
+    forget_token(tok)
+    mw = c.app.middleware_stack
+    while not isinstance(mw, CookieUserMiddleware):
+        mw = mw.app
+    assert mw._cache == {}
+
+
+def test_caller_scoped_session_is_left_alone():
+    # One scope for the whole test, whichever thread serves the request
+    registry = scoped_session(_session_factory(), scopefunc=lambda: 0)
+    app_session = registry()
+    c = TestClient(_app(registry))
+    c.cookies.set("access_token", create_access_token(1, SECRET))
+    assert c.get("/me").json() == {"id": 1}
+    # The app's registry still hands out the same session
+    assert registry() is app_session
+
+
+def test_read_cookie_matches_starlette():
+    cases = (
+        ("access_token=abc",),
+        ('access_token="a b"',),
+        ('access_token="abc";x=1',),
+        ("xaccess_token=bad; access_token=good",),
+        ("xaccess_token=bad",),
+        ("a=1;access_token=x",),
+        ("a=1; access_token = x",),
+        ("access_token=1; access_token=2",),
+        ("foo=access_token=x",),
+        ("a=b; access_token=v; c=access_token",),
+        ("access_token=",),
+        ("",),
+        ("a=1", "access_token=2"),
+        ("access_token=2", "access_token=3"),
+        ("access_token=2", "a=1"),
+        (),
+    )
+    for headers in cases:
+        scope = {"type": "http", "headers": [(b"cookie", h.encode("latin-1")) for h in headers]}
+        expected = HTTPConnection(scope).cookies.get("access_token")
+        assert _read_cookie(scope, "access_token", "access_token=") == expected, headers
+
+
+def _sqlite_repo(d):
+    repo = SQLiteRepository(f"sqlite:///{os.path.join(d, 'auth.db')}")
+    repo.create_account("a@example.com", "x")
+    return repo
+
+
+def _repos():
+    yield SQLAlchemyRepo(_session_factory(), UserModel=Account, ProfileModel=None)
+    with tempfile.TemporaryDirectory() as d:
+        repo = _sqlite_repo(d)
+        yield repo
+        repo.engine.dispose()
+
+
+def test_request_session_recovers_from_failed_write():
+    for repo in _repos():
+        with repo.request_session():
+            try:
+                repo.create_account("A@example.com", "y")
+            except Exception:
+                pass
+            else:
+                raise AssertionError("duplicate email was accepted")
+            # The shared session was rolled back, not left pending
+            assert repo.get_account_by_id(1)["email"] == "a@example.com"
+            new = repo.create_account("b@example.com", "y")
+        # Writes inside the block are committed once, when it exits
+        assert repo.get_account_by_id(new["id"])["email"] == "b@example.com"
+        try:
+            with repo.request_session():
+                repo.create_account("c@example.com", "y")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        assert repo.find_account_by_email("c@example.com") is None, type(repo)
+
+
+def test_sqlite_create_account_with_and_without_returning():
+    for returning in (True, False):
+        with tempfile.TemporaryDirectory() as d:
+            repo = _sqlite_repo(d)
+            repo._insert_returning = returning
+            new = repo.create_account("B@example.com", "y", role="admin")
+            assert new == repo.find_account_by_email("b@example.com"), returning
+            assert new["role"] == "admin" and new["is_active"] is True
+            for exc, kw in ((ValueError, {}), (TypeError, {"bogus": 1})):
+                try:
+                    repo.create_account("b@example.com" if exc is ValueError else "c@example.com", "z", **kw)
+                except exc:
+                    pass
+                else:
+                    raise AssertionError(kw)
+            assert not repo.email_exists("c@example.com")
+            repo.engine.dispose()
+
+
+def test_sqlite_update_account_with_and_without_returning():
+    for returning in (True, False):
+        with tempfile.TemporaryDirectory() as d:
+            repo = _sqlite_repo(d)
+            repo._update_returning = returning
+            out = repo.update_account(1, role="admin", bogus=1)
+            assert out == repo.get_account_by_id(1) and out["role"] == "admin", returning
+            assert repo.update_account(2, role="admin") is None
+            repo.engine.dispose()
+
+
+if __name__ == "__main__":
+    test_cached_user_expires_with_token()
+    test_forget_token_evicts_cached_user()
+    test_caller_scoped_session_is_left_alone()
+    test_read_cookie_matches_starlette()
+    test_request_session_recovers_from_failed_write()
+    test_sqlite_create_account_with_and_without_returning()
+    test_sqlite_update_account_with_and_without_returning()
+    print("arcadia_auth middleware tests passed")
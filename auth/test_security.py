@@ -0,0 +1,143 @@
+from __future__ import annotations
+import hashlib
+import hmac
+import json
+import time
+
+from jose import JWTError, jwt
+from jose.utils import base64url_encode
+
+from arcadia_auth.security import (
+    _FALLBACK,
+    _decode_hs256,
+    _encode_hs256,
+    _hs256_mac,
+    create_access_token,
+    decode_token,
+    forget_token,
+)
+
+SECRET = "test-secret"
+
+
+def _jose(token, options=None, algorithms=("HS256",)):
+    try:
+        return jwt.decode(token, SECRET, algorithms=list(algorithms), options=options)
+    except JWTError:
+        return None
+
+
+def _ours(token, options=None, algorithms=("HS256",)):
+    forget_token(token)  # each check must reach the verifier, not the cache
+    return decode_token(token, SECRET, list(algorithms), options)
+
+
+def _same_as_jose(token, options=None, algorithms=("HS256",), fast=True):
+    assert _ours(token, options, algorithms) == _jose(token, options, algorithms)
+    if fast:
+        # the hand-written verifier decided, not the jose fallback
+        assert _decode_hs256(token, _hs256_mac(SECRET), options) is not _FALLBACK
+
+
+def _segments(header, claims, signature=b"sig"):
+    def enc(obj):
+        return base64url_encode(json.dumps(obj, separators=(",", ":"), sort_keys=True).encode("utf-8"))
+    return (enc(header) + b"." + enc(claims) + b"." + base64url_encode(signature)).decode("ascii")
+
+
+def _claims(**kw):
+    now = int(time.time())
+    claims = {"sub": "1", "iat": now, "exp": now + 60}
+    claims.update(kw)
+    return {k: v for k, v in claims.items() if v is not None}
+
+
+def test_encode_round_trips_through_jose():
+    claims = _claims()
+    tok = _encode_hs256(claims, _hs256_mac(SECRET))
+    assert jwt.decode(tok, SECRET, algorithms=["HS256"]) == claims
+    assert jwt.get_unverified_header(tok) == {"alg": "HS256", "typ": "JWT"}
+    _same_as_jose(tok)
+    _same_as_jose(create_access_token("abc", SECRET))
+
+
+def test_bad_signature():
+    tok = jwt.encode(_claims(), "other-secret", algorithm="HS256")
+    assert _jose(tok) is None
+    _same_as_jose(tok)
+
+
+def test_alg_mismatch():
+    tok = jwt.encode(_claims(), SECRET, algorithm="HS512")
+    _same_as_jose(tok, fast=False)
+    tok = create_access_token(1, SECRET)
+    _same_as_jose(tok, algorithms=("HS512",), fast=False)
+
+
+def test_none_alg():
+    tok = _segments({"alg": "none", "typ": "JWT"}, _claims(), b"")
+    assert _jose(tok) is None
+    _same_as_jose(tok, fast=False)
+
+
+def test_expired_and_leeway():
+    tok = jwt.encode(_claims(exp=int(time.time()) - 10), SECRET, algorithm="HS256")
+    assert _jose(tok) is None
+    _same_as_jose(tok)
+    _same_as_jose(tok, {"leeway": 30})
+    assert _ours(tok, {"leeway": 30}) is not None
+    _same_as_jose(tok, {"leeway": 5})
+    _same_as_jose(tok, {"verify_exp": False})
+
+
+def test_missing_required_claims():
+    for claims, opts in (
+        (_claims(sub=None), {"require_sub": True}),
+        (_claims(exp=None), {"require_exp": True}),
+        (_claims(sub=None, exp=None), None),
+        (_claims(sub=123), None),
+    ):
+        tok = jwt.encode(claims, SECRET, algorithm="HS256")
+        _same_as_jose(tok, opts)
+
+
+def test_malformed_segments():
+    good = create_access_token(1, SECRET)
+    head, body, sig = good.split(".")
+    for tok in (
+        "",
+        "abc",
+        head + "." + body,
+        head + ".!!!." + sig,
+        head + "." + body + ".!!!",
+        head + "." + body + "=." + sig,
+        head + "." + body + "." + sig + "==",
+    ):
+        assert _ours(tok) == _jose(tok), tok
+    # correctly signed, but the payload is not a JSON object
+    for payload in (b"[1,2]", b"not json", b"\xff"):
+        signing_input = head.encode() + b"." + base64url_encode(payload)
+        sig = base64url_encode(hmac.new(SECRET.encode(), signing_input, hashlib.sha256).digest())
+        tok = (signing_input + b"." + sig).decode()
+        assert _jose(tok) is None
+        _same_as_jose(tok)
+
+
+def test_decode_with_unhashable_option_values():
+    tok = create_access_token(7, SECRET)
+    # jose accepts list-valued options; they must not break the decode cache
+    opts = {"require_sub": True, "leeway": 0, "extra": ["x"]}
+    assert decode_token(tok, SECRET, ["HS256"], opts)["sub"] == "7"
+    assert decode_token(tok, SECRET, ["HS256"], opts)["sub"] == "7"
+
+
+if __name__ == "__main__":
+    test_encode_round_trips_through_jose()
+    test_bad_signature()
+    test_alg_mismatch()
+    test_none_alg()
+    test_expired_and_leeway()
+    test_missing_required_claims()
+    test_malformed_segments()
+    test_decode_with_unhashable_option_values()
+    print("arcadia_auth security tests passed")
@@ -11,6 +11,8 @@ class CLI:
         self.prompt = prompt
         self.text_mode = text_mode  # If True, non-command input goes to on_text handler
         self.cmds: Dict[str, Callable] = {}
+        self._help_cache: Optional[str] = None  # rendered help; reset by register()
+        self._nparams: Dict[Callable, int] = {}  # signature arity per command fn
         self._register_builtin()
 
     def _register_builtin(self) -> None:
@@ -19,11 +21,13 @@ class CLI:
             """Show available commands"""
             if not self.cmds:
                 return "No commands available."
-            lines = ["Available commands:"]
-            for name, fn in sorted(self.cmds.items()):
-                help_text = getattr(fn, '__doc__', '') or "No description"
-                lines.append(f"  {self.delim}{name} - {help_text.strip()}")
-            return "\n".join(lines)
+            if self._help_cache is None:
+                lines = ["Available commands:"]
+                for name, fn in sorted(self.cmds.items()):
+                    help_text = getattr(fn, '__doc__', '') or "No description"
+                    lines.append(f"  {self.delim}{name} - {help_text.strip()}")
+                self._help_cache = "\n".join(lines)
+            return self._help_cache
 
         def quit() -> None:
             """Exit the application"""
@@ -38,32 +42,53 @@ class CLI:
         if help:
             fn.__doc__ = help
         self.cmds[cmd_name] = fn
+        self._help_cache = None
+        self._nparams[fn] = len(inspect.signature(fn).parameters)
 
     def _parse_args(self, fn: Callable, args_str: str) -> tuple[list, dict]:
         """Parse arguments for function based on its signature."""
-        if not args_str.strip():
+        args_str = args_str.strip()
+        if not args_str:
             return [], {}
 
-        sig = inspect.signature(fn)
-        params = list(sig.parameters.values())
+        # Introspect once per function; inspect.signature is slow
+        nparams = self._nparams.get(fn)
+        if nparams is None:
+            nparams = self._nparams[fn] = len(inspect.signature(fn).parameters)
 
-        # Simple parsing: split by spaces, handle optional params
-        args = args_str.strip().split()
-
-        if len(params) == 0:
+        if nparams == 0:
             return [], {}
-        elif len(params) == 1:
+        elif nparams == 1:
             # Single parameter - pass the full string
-            return [args_str.strip()] if args_str.strip() else [], {}
+            return [args_str], {}
         else:
-            # Multiple parameters - pass individual args
-            return args, {}
+            # Multiple parameters - pass individual args (split by spaces)
+            return args_str.split(), {}
+
+    def _read_line(self) -> str:
+        """Read one line after the prompt; raises EOFError at end of input.
+
+        Interactive terminals keep input() for line editing and history; piped
+        input goes straight through sys.stdin.readline().
+        """
+        if sys.stdin.isatty():
+            return input(self.prompt)
+        sys.stdout.write(self.prompt)
+        sys.stdout.flush()
+        raw = sys.stdin.readline()
+        if not raw:
+            raise EOFError
+        return raw
 
     def run(self, on_text: Optional[Callable] = None) -> None:
         """Run the command loop."""
+        delim = self.delim
+        dlen = len(delim)
+        cmds = self.cmds
+        text_mode = self.text_mode
         while True:
             try:
-                raw = input(self.prompt).strip()
+                raw = self._read_line().strip()
             except (KeyboardInterrupt, EOFError):
                 break
 
@@ -71,18 +96,15 @@ class CLI:
                 continue
 
             # Check if it's a command (starts with delimiter or no text mode)
-            is_command = raw.startswith(self.delim) or not self.text_mode
+            has_delim = raw.startswith(delim)
 
-            if is_command:
+            if has_delim or not text_mode:
                 # Parse command
-                if raw.startswith(self.delim):
-                    cmd_input = raw[1:]
-                else:
-                    cmd_input = raw
+                cmd_input = raw[dlen:] if has_delim else raw
 
                 cmd_name, _, args_str = cmd_input.partition(" ")
 
-                if cmd_fn := self.cmds.get(cmd_name):
+                if cmd_fn := cmds.get(cmd_name):
                     try:
                         args, kwargs = self._parse_args(cmd_fn, args_str)
                         result = cmd_fn(*args, **kwargs)
@@ -93,7 +115,7 @@ class CLI:
                     except Exception as e:
                         print(f"Error: {e}", flush=True)
                 else:
-                    print(f"Unknown command – {self.delim}help", flush=True)
+                    print(f"Unknown command – {delim}help", flush=True)
             else:
                 # Text mode - pass to handler
                 if on_text:
@@ -2,6 +2,26 @@ from __future__ import annotations
 import json
 from typing import AsyncIterator, Dict
 
+try:  # optional: serializes straight to UTF-8 bytes
+    import orjson as _orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    _orjson = None
+
+
+def _dumps_bytes(obj: Dict) -> bytes:
+    if _orjson is not None:
+        return _orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _frame(obj: Dict) -> bytes:
+    return b"data: " + _dumps_bytes(obj) + b"\n\n"
+
+
+# Constant events, serialized once
+_END_JSON = json.dumps({"end": True})
+_END_FRAME = _frame({"end": True})
+
 
 async def sse_from_openrouter(stream: AsyncIterator[Dict]) -> AsyncIterator[str]:
     """Yield JSON strings suitable for SSE 'data: ...' lines from OpenRouter stream chunks.
@@ -19,7 +39,28 @@ async def sse_from_openrouter(stream: AsyncIterator[Dict]) -> AsyncIterator[str]
             elif kind == "usage":
                 # pass through as-is for clients that care
                 yield json.dumps({"usage": ch.get("usage")})
-        yield json.dumps({"end": True})
+        yield _END_JSON
     except Exception as e:
         yield json.dumps({"error": str(e)})
-        yield json.dumps({"end": True})
+        yield _END_JSON
+
+
+async def sse_frames_from_openrouter(stream: AsyncIterator[Dict]) -> AsyncIterator[bytes]:
+    """Like ``sse_from_openrouter`` but yields complete ``data: ...\\n\\n`` frames as bytes.
+
+    The ASGI server writes bytes as-is, so each event skips the str -> UTF-8
+    encode that a str generator pays in StreamingResponse.
+    """
+    try:
+        async for ch in stream:
+            kind = ch.get("kind")
+            if kind == "content":
+                txt = ch.get("text") or ""
+                if txt:
+                    yield _frame({"delta": txt})
+            elif kind == "usage":
+                yield _frame({"usage": ch.get("usage")})
+        yield _END_FRAME
+    except Exception as e:
+        yield _frame({"error": str(e)})
+        yield _END_FRAME
@@ -1,6 +1,6 @@
 from __future__ import annotations
 import asyncio
-from fastapi_sse import sse_from_openrouter
+from fastapi_sse import sse_from_openrouter, sse_frames_from_openrouter
 
 
 async def _fake_stream():
@@ -16,6 +16,15 @@ async def test_sse_basic():
     assert any('"end": true' in x for x in chunks)
 
 
+def test_sse_frames():
+    async def collect():
+        return [f async for f in sse_frames_from_openrouter(_fake_stream())]
+    frames = asyncio.run(collect())
+    assert frames[0] == b'data: {"delta":"Hello"}\n\n'
+    assert frames[-1] == b'data: {"end":true}\n\n'
+
+
 if __name__ == "__main__":
     asyncio.run(test_sse_basic())
+    test_sse_frames()
     print("fastapi_sse tests passed")
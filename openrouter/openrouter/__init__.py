@@ -7,14 +7,20 @@ from .openrouter import (
     content_from_file,
     with_api_key,
     build_or_messages,
+    close_http_client,
+    aclose_openrouter,
 )
 
 from .models import (
     get_default_catalog,
+    get_default_catalog_frozen,
     fetch_openrouter_models,
+    afetch_openrouter_models,
     merge_catalogs,
     validate_catalog,
     select_model,
+    prepare_catalog,
+    PreparedCatalog,
     export_catalog,
     ensure_models,
     resolve_model_id,
@@ -36,12 +42,18 @@ __all__ = [
     "content_from_file",
     "with_api_key",
     "build_or_messages",
+    "close_http_client",
+    "aclose_openrouter",
     # models helpers
     "get_default_catalog",
+    "get_default_catalog_frozen",
     "fetch_openrouter_models",
+    "afetch_openrouter_models",
     "merge_catalogs",
     "validate_catalog",
     "select_model",
+    "prepare_catalog",
+    "PreparedCatalog",
     "export_catalog",
     "ensure_models",
     "resolve_model_id",
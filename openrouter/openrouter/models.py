@@ -2,9 +2,10 @@ from __future__ import annotations
 import os
 import time
 import json
+from functools import lru_cache
 from typing import TypedDict, NotRequired, List, Dict, Literal, Optional, Callable, Any
 
-import httpx
+from .openrouter import get_async_client, get_sync_client, request_headers
 
 # Lightweight, optional model catalog utilities for OpenRouter
 
@@ -67,21 +68,6 @@ _MODELS_ENDPOINT = "https://openrouter.ai/api/v1/models"
 _CACHE: Dict[str, Any] = {"ts": 0.0, "ttl": 0, "data": []}
 
 
-def _or_headers() -> Dict[str, str]:
-    key = os.getenv("OPENROUTER_API_KEY")
-    if not key:
-        raise RuntimeError("OPENROUTER_API_KEY not set.")
-    headers = {
-        "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json",
-    }
-    app_title = os.getenv("OPENROUTER_APP_TITLE", "Arcadia AI Chat")
-    headers["X-Title"] = app_title
-    if ref := os.getenv("OPENROUTER_REFERER"):
-        headers["HTTP-Referer"] = ref
-    return headers
-
-
 def _provider_from_id(mid: str) -> str:
     return mid.split("/", 1)[0] if "/" in mid else "unknown"
 
@@ -141,11 +127,7 @@ def _mk_spec(
     }
 
 
-def get_default_catalog() -> Catalog:
-    """Return the default catalog with your requested models.
-
-    Pricing is provided as optional hints only; values may be absent.
-    """
+def _build_default_catalog() -> Catalog:
     now_src = {"pricing_source": "openrouter-2025-10-public"}
 
     def v(vision: bool = False, reasoning: bool = False):
@@ -282,14 +264,42 @@ def validate_catalog(cat: Catalog) -> None:
         m["limits"] = lim
 
 
-def _deep_merge(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
-    out = dict(a)
-    for k, v in b.items():
-        if k in out and isinstance(out[k], dict) and isinstance(v, dict):
-            out[k] = _deep_merge(out[k], v)
-        else:
-            out[k] = v
-    return out
+# Built and validated once at import; callers get fresh copies decoded from the JSON snapshot
+_default = _build_default_catalog()
+validate_catalog(_default)
+_DEFAULT_CATALOG: tuple[ModelSpec, ...] = tuple(_default)
+del _default
+_DEFAULT_CATALOG_JSON = json.dumps(list(_DEFAULT_CATALOG))
+
+
+def get_default_catalog() -> Catalog:
+    """Return the default catalog with your requested models.
+
+    Pricing is provided as optional hints only; values may be absent.
+    The result is a fresh copy the caller may mutate.
+    """
+    return json.loads(_DEFAULT_CATALOG_JSON)
+
+
+def get_default_catalog_frozen() -> tuple[ModelSpec, ...]:
+    """Return the shared default catalog for read-only use. Do not mutate it."""
+    return _DEFAULT_CATALOG
+
+
+def _deep_merge_into(dst: Dict[str, Any], src: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge ``src`` into ``dst`` in place, copying nested dicts of ``dst`` before writing."""
+    stack = [(dst, src)]
+    while stack:
+        d, s = stack.pop()
+        for k, v in s.items():
+            cur = d.get(k)
+            if isinstance(v, dict) and isinstance(cur, dict):
+                if v:  # an empty override leaves the existing dict as-is
+                    d[k] = cur = dict(cur)
+                    stack.append((cur, v))
+            else:
+                d[k] = v
+    return dst
 
 
 def merge_catalogs(
@@ -305,9 +315,9 @@ def merge_catalogs(
             continue
         if mid in idx:
             if on_conflict == "prefer_overrides":
-                idx[mid] = _deep_merge(idx[mid], m)  # type: ignore
+                _deep_merge_into(idx[mid], m)  # type: ignore
             else:
-                idx[mid] = _deep_merge(m, idx[mid])  # type: ignore
+                idx[mid] = _deep_merge_into(dict(m), idx[mid])  # type: ignore
         else:
             idx[mid] = dict(m)
     out = list(idx.values())
@@ -315,61 +325,94 @@ def merge_catalogs(
     return out
 
 
+Task = Literal["chat", "reason", "vision", "json", "tool"]
+_TASKS: tuple[Task, ...] = ("chat", "reason", "vision", "json", "tool")
+
+
+def _supports(m: ModelSpec, task: str) -> bool:
+    mods = m.get("modalities", {})
+    feats = m.get("features", {})
+    if task == "vision":
+        return bool(mods.get("vision"))
+    if task == "json":
+        return bool(feats.get("json_mode", True))
+    if task == "tool":
+        return bool(feats.get("tool_use", True) or feats.get("function_call", True))
+    if task == "reason":
+        return bool(feats.get("reasoning"))
+    return bool(mods.get("text", True))
+
+
+class PreparedCatalog:
+    """A validated catalog with per-task candidate lists precomputed.
+
+    Build it once with ``prepare_catalog`` and pass it to ``select_model`` on
+    the request path. Mutating the underlying specs afterwards is not tracked.
+    """
+
+    __slots__ = ("models", "by_task")
+
+    def __init__(self, models: Catalog):
+        self.models = models
+        self.by_task: Dict[str, List[ModelSpec]] = {
+            t: [m for m in models if _supports(m, t)] for t in _TASKS
+        }
+
+
+def prepare_catalog(cat: Catalog) -> PreparedCatalog:
+    validate_catalog(cat)
+    return PreparedCatalog(cat)
+
+
+@lru_cache(maxsize=8)
+def _allowed_models(csv: str) -> Optional[frozenset[str]]:
+    csv = csv.strip()
+    if not csv:
+        return None
+    return frozenset(x.strip() for x in csv.split(",") if x.strip())
+
+
+_QUALITY_RANK = {"low": 0, "mid": 1, "high": 2}
+_SPEED_RANK = {"fast": 2, "balanced": 1, "slow": 0}
+
+
 def select_model(
-    cat: Catalog,
+    cat: Catalog | PreparedCatalog,
     *,
-    task: Literal["chat", "reason", "vision", "json", "tool"],
+    task: Task,
     budget: Literal["low", "mid", "high"] = "mid",
     prefer: Optional[List[str]] = None,
 ) -> ModelSpec:
-    validate_catalog(cat)
-    prefer = prefer or []
-
-    def ok(m: ModelSpec) -> bool:
-        mods = m.get("modalities", {})
-        feats = m.get("features", {})
-        if task == "vision":
-            return bool(mods.get("vision"))
-        if task == "json":
-            return bool(feats.get("json_mode", True))
-        if task == "tool":
-            return bool(feats.get("tool_use", True) or feats.get("function_call", True))
-        if task == "reason":
-            return bool(feats.get("reasoning"))
-        return bool(mods.get("text", True))
-
-    allowed_csv = os.getenv("OPENROUTER_ALLOWED_MODELS", "").strip()
-    allowed: Optional[set[str]] = None
-    if allowed_csv:
-        allowed = {x.strip() for x in allowed_csv.split(",") if x.strip()}
-
-    pool = [m for m in cat if ok(m) and ((allowed is None) or (m["id"] in allowed))]
+    if isinstance(cat, PreparedCatalog):
+        candidates = cat.by_task.get(task)
+        if candidates is None:  # unknown task falls back to the chat filter
+            candidates = cat.by_task["chat"]
+    else:
+        validate_catalog(cat)
+        candidates = [m for m in cat if _supports(m, task)]
+
+    allowed = _allowed_models(os.getenv("OPENROUTER_ALLOWED_MODELS", ""))
+    pool = candidates if allowed is None else [m for m in candidates if m["id"] in allowed]
     if not pool:
         raise ValidationError("No models match the selection criteria")
 
     # Prefer explicit ids first
-    for p in prefer:
+    for p in prefer or ():
         for m in pool:
             if m["id"] == p:
                 return m
 
     # Rank by (budget ~ tiers.quality), then speed
-    quality_rank = {"low": 0, "mid": 1, "high": 2}
-    speed_rank = {"fast": 2, "balanced": 1, "slow": 0}
+    target = _QUALITY_RANK[budget]
 
     def key(m: ModelSpec):
         t = m.get("tiers", {})
-        q = t.get("quality", "mid")
-        s = t.get("speed", "balanced")
-        # Adjust target quality to budget preference
-        target = {"low": 0, "mid": 1, "high": 2}[budget]
-        qv = quality_rank.get(q, 1)
         # closeness to target quality; smaller is better
-        qscore = -abs(qv - target)
-        return (qscore, speed_rank.get(s, 1))
+        qscore = -abs(_QUALITY_RANK.get(t.get("quality", "mid"), 1) - target)
+        return (qscore, _SPEED_RANK.get(t.get("speed", "balanced"), 1))
 
-    pool.sort(key=key, reverse=True)
-    return pool[0]
+    # max() keeps the first of equal keys, like the stable reverse sort it replaces
+    return max(pool, key=key)
 
 
 def export_catalog(cat: Catalog, *, format: Literal["json", "dict"] = "json") -> str | List[Dict[str, Any]]:
@@ -380,36 +423,46 @@ def export_catalog(cat: Catalog, *, format: Literal["json", "dict"] = "json") ->
 
 
 def ensure_models(upserter: Callable[[ModelSpec], None], cat: Catalog | None = None) -> None:
-    data = cat or get_default_catalog()
-    validate_catalog(data)
+    if cat:
+        data = cat
+        validate_catalog(data)
+    else:
+        data = get_default_catalog()  # already validated at import
     for m in data:
         upserter(m)
 
 
+def _resolver_index(cat) -> tuple[Dict[str, tuple[int, str]], Dict[str, tuple[int, str]]]:
+    """Map ids and lowercased labels to (position, id); the first occurrence wins."""
+    ids: Dict[str, tuple[int, str]] = {}
+    labels: Dict[str, tuple[int, str]] = {}
+    for i, m in enumerate(cat):
+        ids.setdefault(m["id"], (i, m["id"]))
+        labels.setdefault(m.get("label", "").lower(), (i, m["id"]))
+    return ids, labels
+
+
+_DEFAULT_RESOLVER = _resolver_index(_DEFAULT_CATALOG)
+_NO_MATCH = (1 << 62, "")
+
+
 def resolve_model_id(alias_or_id: str, cat: Catalog | None = None) -> str:
-    cat = cat or get_default_catalog()
+    if not cat:
+        # The default catalog never changes, so its index is built once
+        ids, labels = _DEFAULT_RESOLVER
+        # min() by position keeps scan order: the earliest matching spec wins
+        hit = min(ids.get(alias_or_id, _NO_MATCH), labels.get(alias_or_id.lower(), _NO_MATCH))
+        return hit[1] or alias_or_id
+    folded = alias_or_id.lower()
     for m in cat:
         if m.get("id") == alias_or_id:
             return alias_or_id
-        if m.get("label", "").lower() == alias_or_id.lower():
+        if m.get("label", "").lower() == folded:
             return m["id"]
     return alias_or_id
 
 
-def fetch_openrouter_models(ttl: int = 3600) -> Catalog:
-    now = time.time()
-    if _CACHE["data"] and (now - _CACHE["ts"]) < _CACHE["ttl"]:
-        return _CACHE["data"]  # type: ignore
-
-    key = os.getenv("OPENROUTER_API_KEY")
-    if not key:
-        raise RuntimeError("OPENROUTER_API_KEY not set.")
-
-    with httpx.Client(timeout=20) as client:
-        r = client.get(_MODELS_ENDPOINT, headers=_or_headers())
-        r.raise_for_status()
-        raw = r.json()
-
+def _catalog_from_listing(raw: Any) -> Catalog:
     items = raw.get("data") if isinstance(raw, dict) else raw
     cat: Catalog = []
     if isinstance(items, list):
@@ -432,5 +485,30 @@ def fetch_openrouter_models(ttl: int = 3600) -> Catalog:
             )
 
     validate_catalog(cat)
+    return cat
+
+
+def fetch_openrouter_models(ttl: int = 3600) -> Catalog:
+    now = time.time()
+    if _CACHE["data"] and (now - _CACHE["ts"]) < _CACHE["ttl"]:
+        return _CACHE["data"]  # type: ignore
+
+    # Shared pooled client, so TTL refreshes reuse the kept-alive connection
+    r = get_sync_client().get(_MODELS_ENDPOINT, headers=request_headers(), timeout=20)
+    r.raise_for_status()
+    cat = _catalog_from_listing(r.json())
+    _CACHE.update({"ts": now, "ttl": int(ttl), "data": cat})
+    return cat
+
+
+async def afetch_openrouter_models(ttl: int = 3600) -> Catalog:
+    """Async variant of ``fetch_openrouter_models``; shares its TTL cache."""
+    now = time.time()
+    if _CACHE["data"] and (now - _CACHE["ts"]) < _CACHE["ttl"]:
+        return _CACHE["data"]  # type: ignore
+
+    r = await get_async_client().get(_MODELS_ENDPOINT, headers=request_headers(), timeout=20)
+    r.raise_for_status()
+    cat = _catalog_from_listing(r.json())
     _CACHE.update({"ts": now, "ttl": int(ttl), "data": cat})
     return cat
@@ -95,8 +95,11 @@ def seed_sqlite(
     cat: Optional[Catalog] = None,
 ) -> int:
     conn = ensure_sqlite_schema(conn_or_path, table)
-    data = cat or get_default_catalog()
-    validate_catalog(data)
+    if cat:
+        data = cat
+        validate_catalog(data)
+    else:
+        data = get_default_catalog()  # already validated at import
     upsert = sqlite_upserter(conn, table=table, autocommit=False)
     for m in data:
         upsert(m)
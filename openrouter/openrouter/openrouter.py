@@ -6,13 +6,30 @@ import mimetypes
 import httpx
 from typing import AsyncIterator, Dict, List, Optional, Literal, TypedDict, NotRequired, Union, IO, Callable
 from contextlib import contextmanager
+from functools import lru_cache
 import asyncio
 import time
 import random
 
+try:  # optional: faster parsing of streamed chunks
+    import orjson as _orjson
+    _json_loads = _orjson.loads
+except ImportError:  # pragma: no cover - stdlib fallback
+    _orjson = None
+    _json_loads = json.loads
+
+def _encode_body(payload: Dict) -> bytes:
+    """Serialize a request body once (orjson when available), as httpx's json= would."""
+    if _orjson is not None:
+        try:
+            return _orjson.dumps(payload)
+        except TypeError:
+            pass  # types orjson rejects; let the stdlib encoder decide
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
 _BASE_URL = "https://openrouter.ai/api/v1/chat/completions"
 
-def _headers() -> Dict[str, str]:
+def request_headers() -> Dict[str, str]:
     """Build request headers using the current env value.
 
     Delays API key lookup to call-time so .env can be loaded earlier
@@ -23,26 +40,41 @@ def _headers() -> Dict[str, str]:
         raise RuntimeError(
             "OPENROUTER_API_KEY not set. Export it or put it in .env before calling OpenRouter."
         )
+    # Optional headers recommended by OpenRouter
+    # Allow override via env vars, with a sensible default X-Title
+    return _build_headers(key, os.getenv("OPENROUTER_APP_TITLE", "Arcadia AI Chat"), os.getenv("OPENROUTER_REFERER"))
+
+
+@lru_cache(maxsize=8)
+def _build_headers(key: str, app_title: str, referer: Optional[str]) -> Dict[str, str]:
+    # Keyed on the env values, so with_api_key() and env changes still apply;
+    # the returned dict is shared and must not be mutated
     headers = {
         "Authorization": f"Bearer {key}",
         "Content-Type": "application/json",
+        "X-Title": app_title,
     }
-    # Optional headers recommended by OpenRouter
-    # Allow override via env vars, with a sensible default X-Title
-    app_title = os.getenv("OPENROUTER_APP_TITLE", "Arcadia AI Chat")
-    headers["X-Title"] = app_title
-    if ref := os.getenv("OPENROUTER_REFERER"):
-        headers["HTTP-Referer"] = ref
+    if referer:
+        headers["HTTP-Referer"] = referer
     return headers
 
 _RETRIABLE_STATUS = {429, 500, 502, 503, 504}
 _MAX_RETRIES = int(os.getenv("OPENROUTER_MAX_RETRIES", "2"))
 
-# Persistent clients to reuse connections and reduce handshake overhead
+# Persistent clients to reuse connections and reduce handshake overhead.
+# With the optional h2 package installed, concurrent streams multiplex over
+# one HTTP/2 connection instead of opening one TCP+TLS connection each.
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
 _sync_client: Optional[httpx.Client] = None
 _async_client: Optional[httpx.AsyncClient] = None
 
-def _get_sync_client() -> httpx.Client:
+def get_sync_client() -> httpx.Client:
+    """Process-wide pooled sync client shared by every OpenRouter call."""
     global _sync_client
     if _sync_client is None:
         _sync_client = httpx.Client(
@@ -51,15 +83,32 @@ def _get_sync_client() -> httpx.Client:
         )
     return _sync_client
 
-def _get_async_client() -> httpx.AsyncClient:
+def get_async_client() -> httpx.AsyncClient:
+    """Process-wide pooled async client shared by every OpenRouter call."""
     global _async_client
     if _async_client is None:
         _async_client = httpx.AsyncClient(
+            http2=_HTTP2,
             timeout=httpx.Timeout(connect=10.0, read=None, write=10.0, pool=10.0),
             limits=httpx.Limits(max_keepalive_connections=5, max_connections=10),
         )
     return _async_client
 
+def close_http_client() -> None:
+    """Close the shared sync client; the next call opens a fresh one."""
+    global _sync_client
+    client, _sync_client = _sync_client, None
+    if client is not None:
+        client.close()
+
+async def aclose_openrouter() -> None:
+    """Close both shared clients, e.g. on app shutdown; later calls reopen them."""
+    global _async_client
+    close_http_client()
+    client, _async_client = _async_client, None
+    if client is not None:
+        await client.aclose()
+
 def _backoff_delay(attempt: int, retry_after: Optional[str]) -> float:
     if retry_after and retry_after.isdigit():
         base = float(retry_after)
@@ -80,22 +129,28 @@ class StreamController:
     def __init__(self, generator_factory):
         self.generator_factory = generator_factory
         self._cancelled = asyncio.Event()
-        self._task: Optional[asyncio.Task] = None
 
     async def __aiter__(self):
         """Iterate over the stream, checking for cancellation."""
-        self._task = asyncio.current_task()
         generator = self.generator_factory(cancellation_event=self._cancelled)
-        async for chunk in generator:
-            if self._cancelled.is_set():
-                break
-            yield chunk
+        try:
+            # The generator watches the event itself and ends promptly, after
+            # flushing any text a coalescing stage had already received
+            async for chunk in generator:
+                yield chunk
+        finally:
+            # Close the upstream response now rather than at garbage collection
+            await generator.aclose()
 
     def stop(self):
-        """Stop the stream immediately."""
+        """Stop the stream.
+
+        Cooperative: the generator sees the flag and closes the upstream
+        response; no CancelledError is raised into the consuming task.
+        Content already received but held back by coalescing is still
+        delivered before the stream ends.
+        """
         self._cancelled.set()
-        if self._task and not self._task.done():
-            self._task.cancel()
 
     @property
     def stopped(self) -> bool:
@@ -124,10 +179,11 @@ def complete(
     if top_p is not None:
         payload["top_p"] = top_p
 
+    body = _encode_body(payload)
     last_err: Optional[Exception] = None
     for attempt in range(_MAX_RETRIES + 1):
         try:
-            resp = _get_sync_client().post(_BASE_URL, headers=_headers(), json=payload)
+            resp = get_sync_client().post(_BASE_URL, headers=request_headers(), content=body)
             resp.raise_for_status()
             return resp.json()
         except httpx.HTTPStatusError as e:
@@ -149,6 +205,74 @@ def complete(
         raise last_err
     raise RuntimeError("OpenRouter request failed without specific error")
 
+async def _sse_data(r: httpx.Response) -> AsyncIterator[bytearray]:
+    """Yield the payload of each ``data: `` line of an SSE response body.
+
+    Frames lines directly on the raw bytes (LF or CRLF endings), so the body
+    is never decoded to str; payloads go straight to the JSON parser.
+    """
+    buf = bytearray()
+    async for piece in r.aiter_bytes():
+        buf += piece
+        start = 0
+        while (nl := buf.find(b"\n", start)) >= 0:
+            end = nl - 1 if nl > start and buf[nl - 1] == 13 else nl
+            if buf.startswith(b"data: ", start, end):
+                yield buf[start + 6:end]
+            start = nl + 1
+        if start:
+            del buf[:start]
+    # Trailing line without a terminator
+    end = len(buf) - 1 if buf.endswith(b"\r") else len(buf)
+    if buf.startswith(b"data: ", 0, end):
+        yield buf[6:end]
+
+
+async def _until_set(source: AsyncIterator, event: asyncio.Event) -> AsyncIterator:
+    """Relay `source` until `event` is set, waking at once even if `source` is idle.
+
+    Reads are awaited directly; a single watcher per stream cancels the
+    consuming task only while it is parked inside a read, so no task is
+    created per event.
+    """
+    it = source.__aiter__()
+    # The task parked in the current read; wrappers such as _coalesce may
+    # drive reads from their own helper task, so it is captured per read
+    reader: Optional[asyncio.Task] = None
+    interrupted: Optional[asyncio.Task] = None
+
+    def on_stop(_: asyncio.Future) -> None:
+        nonlocal interrupted
+        if reader is not None and interrupted is None:
+            interrupted = reader
+            reader.cancel()
+
+    stopped = asyncio.ensure_future(event.wait())
+    stopped.add_done_callback(on_stop)
+    try:
+        while not event.is_set():
+            reader = asyncio.current_task()
+            try:
+                item = await it.__anext__()
+            except StopAsyncIteration:
+                break
+            except asyncio.CancelledError:
+                if interrupted is None:
+                    raise
+                break  # our own wake-up, not an outside cancellation
+            finally:
+                reader = None
+            yield item
+    finally:
+        stopped.remove_done_callback(on_stop)
+        stopped.cancel()
+        if interrupted is not None:
+            uncancel = getattr(interrupted, "uncancel", None)  # 3.11+
+            if uncancel is not None:
+                uncancel()
+        await it.aclose()
+
+
 # ---------- new single async generator ----------
 async def _astream_generator(
     messages: List[dict],
@@ -170,25 +294,24 @@ async def _astream_generator(
         "include_reasoning": thinking,
     }
 
+    body = _encode_body(payload)
+
     # Retry only around establishing the stream; once streaming begins, we don't retry mid-stream.
     for attempt in range(_MAX_RETRIES + 1):
         try:
-            client = _get_async_client()
+            client = get_async_client()
             async with client.stream(
-                "POST", _BASE_URL, headers=_headers(), json=payload
+                "POST", _BASE_URL, headers=request_headers(), content=body
             ) as r:
                 r.raise_for_status()
-                async for line in r.aiter_lines():
-                    # Check for cancellation
-                    if cancellation_event and cancellation_event.is_set():
-                        break
+                events = _sse_data(r)
+                if cancellation_event is not None:
+                    events = _until_set(events, cancellation_event)
+                async for chunk in events:
 
-                    if not line or not line.startswith("data: "):
-                        continue
-                    chunk = line[6:]
-                    if chunk == "[DONE]":
+                    if chunk == b"[DONE]":
                         break
-                    data = json.loads(chunk)
+                    data = _json_loads(chunk)
 
                     # usage block (sent once at the end)
                     if "usage" in data:
@@ -196,18 +319,21 @@ async def _astream_generator(
                         continue
 
                     delta = data["choices"][0].get("delta", {})
-
-                    # reasoning text
-                    reason = (delta.get("reasoning") or "") + "".join(
-                        rd["text"]
-                        for rd in delta.get("reasoning_details", [])
-                        if rd.get("type") == "reasoning.text"
-                    )
+                    get = delta.get
+
+                    # reasoning text; details are usually absent, so skip the join
+                    reason = get("reasoning") or ""
+                    if rds := get("reasoning_details"):
+                        parts = [rd["text"] for rd in rds if rd.get("type") == "reasoning.text"]
+                        if parts:
+                            reason += "".join(parts)
                     if reason:
                         yield {"kind": "reasoning", "text": reason}
+                        if cancellation_event is not None and cancellation_event.is_set():
+                            break
 
                     # response text
-                    if content := delta.get("content"):
+                    if content := get("content"):
                         yield {"kind": "content", "text": content}
             return
         except httpx.HTTPStatusError as e:
@@ -223,22 +349,173 @@ async def _astream_generator(
                 continue
             raise
 
+_END = object()
+
+
+async def _buffered(
+    source: AsyncIterator[Chunk],
+    limit: int,
+    cancellation_event: Optional[asyncio.Event] = None,
+) -> AsyncIterator[Chunk]:
+    """Read `source` in a background task through a queue of at most `limit` chunks.
+
+    Network reads and parsing run ahead of a slow consumer up to `limit`
+    chunks, then pause (backpressure). Setting `cancellation_event` cancels
+    the reader task, which closes the upstream response.
+    """
+    q: asyncio.Queue = asyncio.Queue(limit)
+    error: List[BaseException] = []
+
+    async def pump() -> None:
+        try:
+            async for ch in source:
+                await q.put(ch)
+        except asyncio.CancelledError:
+            # Stopping: buffered chunks are moot, make room for the end marker
+            while not q.empty():
+                q.get_nowait()
+            q.put_nowait(_END)
+            raise
+        except BaseException as e:
+            error.append(e)
+        await q.put(_END)
+
+    reader = asyncio.ensure_future(pump())
+    stopped: Optional[asyncio.Future] = None
+    if cancellation_event is not None:
+        stopped = asyncio.ensure_future(cancellation_event.wait())
+        stopped.add_done_callback(lambda _: reader.cancel())
+    try:
+        while (ch := await q.get()) is not _END:
+            if cancellation_event is not None and cancellation_event.is_set():
+                break  # already-queued chunks are dropped once stopped
+            yield ch
+        if error:
+            raise error[0]
+    finally:
+        if stopped is not None:
+            stopped.cancel()
+        if not reader.done():
+            reader.cancel()
+        try:
+            await reader
+        except BaseException:
+            pass
+
+
+async def _coalesce(
+    source: AsyncIterator[Chunk],
+    max_chars: int = 0,
+    max_delay: float = 0.0,
+) -> AsyncIterator[Chunk]:
+    """Merge consecutive "content" chunks from `source`.
+
+    A merged chunk is emitted once it reaches `max_chars` characters (if > 0),
+    once the oldest buffered delta is `max_delay` seconds old (if > 0), or
+    before any non-content chunk and at the end of the stream.
+    """
+    loop = asyncio.get_running_loop()
+    it = source.__aiter__()
+    pending: List[str] = []
+    size = 0
+    deadline = 0.0
+    nxt: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending and max_delay > 0:
+                # Wait for the next chunk without cancelling it on timeout
+                if nxt is None:
+                    nxt = asyncio.ensure_future(it.__anext__())
+                done, _ = await asyncio.wait((nxt,), timeout=max(0.0, deadline - loop.time()))
+                if not done:
+                    yield {"kind": "content", "text": "".join(pending)}
+                    pending, size = [], 0
+                    continue
+            try:
+                if nxt is not None:
+                    ch = await nxt
+                    nxt = None
+                else:
+                    ch = await it.__anext__()
+            except StopAsyncIteration:
+                nxt = None
+                break
+            except Exception:
+                nxt = None
+                # Deliver what arrived before the failure, as an uncoalesced stream would
+                if pending:
+                    yield {"kind": "content", "text": "".join(pending)}
+                    pending, size = [], 0
+                raise
+            if ch["kind"] == "content":
+                if not pending:
+                    deadline = loop.time() + max_delay
+                pending.append(ch["text"])
+                size += len(ch["text"])
+                if max_chars > 0 and size >= max_chars:
+                    yield {"kind": "content", "text": "".join(pending)}
+                    pending, size = [], 0
+                continue
+            if pending:
+                yield {"kind": "content", "text": "".join(pending)}
+                pending, size = [], 0
+            yield ch
+        if pending:
+            yield {"kind": "content", "text": "".join(pending)}
+    finally:
+        if nxt is not None:
+            nxt.cancel()
+            try:
+                await nxt
+            except BaseException:
+                pass
+        aclose = getattr(it, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
 def astream(
     messages: List[dict],
     model: str,
     *,
     max_tokens: int = 32_768,
     thinking: bool = False,
+    coalesce_chars: int = 0,
+    coalesce_ms: float = 0,
+    buffer_limit: int = 0,
 ) -> StreamController:
     """
     Return a controllable stream that allows stopping generation mid-stream.
 
+    `coalesce_chars` / `coalesce_ms` (both off by default) merge consecutive
+    content deltas into one chunk until that many characters are buffered or
+    the oldest buffered delta is that many milliseconds old, cutting per-chunk
+    overhead for token-per-event streams.
+
+    `buffer_limit` > 0 reads and parses the upstream in a background task,
+    buffering up to that many chunks ahead of the consumer.
+
     Returns:
         StreamController: A stream object with stop() method to cancel generation.
     """
-    return StreamController(lambda cancellation_event=None: _astream_generator(
-        messages, model, max_tokens=max_tokens, thinking=thinking, cancellation_event=cancellation_event
-    ))
+    def factory(cancellation_event=None):
+        if buffer_limit > 0:
+            # The buffer's reader task is cancelled on stop, so the inner
+            # generator needs no per-read race against the event
+            gen = _buffered(
+                _astream_generator(messages, model, max_tokens=max_tokens, thinking=thinking),
+                buffer_limit,
+                cancellation_event,
+            )
+        else:
+            gen = _astream_generator(
+                messages, model, max_tokens=max_tokens, thinking=thinking, cancellation_event=cancellation_event
+            )
+        if coalesce_chars > 0 or coalesce_ms > 0:
+            return _coalesce(gen, coalesce_chars, coalesce_ms / 1000.0)
+        return gen
+
+    return StreamController(factory)
 
 async def consume_and_drop(generator: AsyncIterator[Chunk]) -> None:
     """Consume and drop the rest of a stream."""
@@ -0,0 +1,300 @@
+from __future__ import annotations
+import asyncio
+import json
+
+import httpx
+
+from openrouter import aclose_openrouter, astream, with_api_key
+from openrouter import openrouter as core
+from openrouter.openrouter import _buffered, _coalesce, _sse_data, _until_set
+
+BODY = (
+    b": OPENROUTER PROCESSING\r\n"
+    b"\r\n"
+    b'data: {"choices":[{"delta":{"content":"Hel"}}]}\r\n'
+    b"\r\n"
+    b": keep-alive\n"
+    b'data: {"choices":[{"delta":{"content":"lo \\u00e9"}}]}\n'
+    b'data: {"choices":[{"delta":{"reasoning":"r"}}]}\n'
+    b"event: ping\n"
+    b"\n"
+    b'data: {"usage":{"total_tokens":3}}\n'
+    b"\n"
+    b"data: [DONE]\n"
+    b"\n"
+    b'data: {"choices":[{"delta":{"content":"ignored"}}]}\n'
+)
+
+
+def _response(pieces):
+    async def body():
+        for p in pieces:
+            yield p
+    return httpx.Response(200, content=body())
+
+
+def _sse(pieces):
+    async def collect():
+        return [bytes(d) async for d in _sse_data(_response(pieces))]
+    return asyncio.run(collect())
+
+
+def _reference(pieces):
+    """What the line-based parser this framer replaced would see."""
+    async def collect():
+        return [
+            line[6:].encode("utf-8")
+            async for line in _response(pieces).aiter_lines()
+            if line.startswith("data: ")
+        ]
+    return asyncio.run(collect())
+
+
+def test_sse_data_lines():
+    got = _sse([BODY])
+    assert got == _reference([BODY])
+    assert got[0] == b'{"choices":[{"delta":{"content":"Hel"}}]}'
+    assert got[-2] == b"[DONE]"
+    # comments, blank lines and other fields are skipped
+    assert all(not d.startswith((b":", b"event")) and d for d in got)
+
+
+def test_sse_data_split_across_chunks():
+    expected = _reference([BODY])
+    for i in range(1, len(BODY)):
+        assert _sse([BODY[:i], BODY[i:]]) == expected, i
+    assert _sse([BODY[i:i + 1] for i in range(len(BODY))]) == expected
+
+
+def test_sse_data_multiline_and_trailing():
+    body = b"data: first\r\ndata: second\r\n\r\ndata: tail"
+    assert _sse([body]) == [b"first", b"second", b"tail"]
+    assert _sse([body[:-1], body[-1:]]) == [b"first", b"second", b"tail"]
+    assert _sse([b"data: tail\r"]) == [b"tail"]
+
+
+def _run_astream(**kw):
+    async def body():
+        for i in range(0, len(BODY), 7):
+            yield BODY[i:i + 7]
+
+    async def run():
+        core._async_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body()))
+        )
+        try:
+            with with_api_key("k"):
+                return [c async for c in astream([{"role": "user", "content": "hi"}], "m", **kw)]
+        finally:
+            await aclose_openrouter()
+
+    return asyncio.run(run())
+
+
+def test_astream_parses_events():
+    chunks = _run_astream()
+    assert [c["kind"] for c in chunks] == ["content", "content", "reasoning", "usage"]
+    assert "".join(c["text"] for c in chunks if c["kind"] == "content") == "Hello é"
+    assert chunks[-1]["usage"] == json.loads('{"total_tokens":3}')
+
+
+def test_astream_coalesce_and_buffer_options():
+    for kw in ({"coalesce_chars": 64}, {"coalesce_ms": 50}, {"buffer_limit": 2}, {"buffer_limit": 1, "coalesce_chars": 64}):
+        chunks = _run_astream(**kw)
+        kinds = [c["kind"] for c in chunks]
+        if "buffer_limit" in kw and len(kw) == 1:
+            assert kinds == ["content", "content", "reasoning", "usage"], kw
+        else:
+            assert kinds == ["content", "reasoning", "usage"], kw
+            assert chunks[0]["text"] == "Hello é"
+
+
+def _content(*texts):
+    return [{"kind": "content", "text": t} for t in texts]
+
+
+async def _source(items, *, delay=0.0, error=None, closed=None):
+    try:
+        for it in items:
+            if isinstance(it, (int, float)):
+                await asyncio.sleep(it)  # numbers are pauses
+                continue
+            if delay:
+                await asyncio.sleep(delay)
+            yield it
+        if error is not None:
+            raise error
+    finally:
+        if closed is not None:
+            closed.append(True)
+
+
+def _collect(gen):
+    async def run():
+        return [c async for c in gen]
+    return asyncio.run(run())
+
+
+def test_coalesce_flushes_on_size_and_at_end():
+    out = _collect(_coalesce(_source(_content("ab", "cd", "ef")), max_chars=4))
+    assert out == _content("abcd", "ef")
+    usage = {"kind": "usage", "text": "", "usage": {}}
+    out = _collect(_coalesce(_source(_content("a", "b") + [usage] + _content("c")), max_chars=100))
+    assert out == _content("ab") + [usage] + _content("c")
+
+
+def test_coalesce_flushes_on_timeout():
+    async def run():
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        seen = []
+        async for ch in _coalesce(_source(_content("a", "b") + [0.3] + _content("c")), max_delay=0.05):
+            seen.append((ch["text"], loop.time() - t0))
+        return seen
+    seen = asyncio.run(run())
+    assert [t for t, _ in seen] == ["ab", "c"]
+    # the first flush came from the deadline, not from the next chunk
+    assert seen[0][1] < 0.25
+
+
+def test_coalesce_and_buffered_propagate_errors():
+    for wrap in (lambda s: _coalesce(s, max_delay=0.01), lambda s: _buffered(s, 2)):
+        got = []
+
+        async def run():
+            async for ch in wrap(_source(_content("a"), error=ValueError("boom"))):
+                got.append(ch["text"])
+
+        try:
+            asyncio.run(run())
+        except ValueError as e:
+            assert str(e) == "boom"
+        else:
+            raise AssertionError("error was swallowed")
+        assert got == ["a"]
+
+
+def test_buffered_reads_ahead_and_stops_reader_early():
+    async def run():
+        before = asyncio.all_tasks()
+        closed = []
+        gen = _buffered(_source(_content(*"abcdefgh"), delay=0.001, closed=closed), 2)
+        first = await gen.__anext__()
+        await gen.aclose()
+        return first, closed, asyncio.all_tasks() - before
+    first, closed, leftover = asyncio.run(run())
+    assert first == _content("a")[0]
+    assert closed == [True]
+    assert leftover == set()
+
+
+def test_buffered_cancellation_event_cancels_reader():
+    async def run():
+        closed = []
+        stop = asyncio.Event()
+        out = []
+        async for ch in _buffered(_source(_content("a") + [30] + _content("b"), closed=closed), 4, stop):
+            out.append(ch["text"])
+            stop.set()
+        return out, closed
+    out, closed = asyncio.run(asyncio.wait_for(run(), 5))
+    assert out == ["a"] and closed == [True]
+
+
+def test_coalesce_early_stop_cancels_pending_read():
+    async def run():
+        before = asyncio.all_tasks()
+        closed = []
+        gen = _coalesce(_source(_content("a") + [30] + _content("b"), closed=closed), max_delay=0.01)
+        first = await gen.__anext__()
+        await gen.aclose()
+        return first, closed, asyncio.all_tasks() - before
+    first, closed, leftover = asyncio.run(asyncio.wait_for(run(), 5))
+    assert first == _content("a")[0]
+    assert closed == [True]
+    assert leftover == set()
+
+
+def test_until_set_reuses_one_watcher_and_wakes_idle_reads():
+    async def run():
+        loop = asyncio.get_running_loop()
+        created = []
+
+        def factory(loop, coro, **kw):
+            created.append(coro)
+            return asyncio.Task(coro, loop=loop, **kw)
+
+        loop.set_task_factory(factory)
+        before = asyncio.all_tasks()
+        stop = asyncio.Event()
+        closed = []
+        out = []
+        async for ch in _until_set(_source(_content(*"abc") + [30] + _content("d"), closed=closed), stop):
+            out.append(ch["text"])
+            if len(out) == 3:
+                loop.call_later(0.05, stop.set)
+        loop.set_task_factory(None)
+        cancelling = getattr(asyncio.current_task(), "cancelling", lambda: 0)()
+        return out, len(created), closed, asyncio.all_tasks() - before, cancelling
+    out, n_tasks, closed, leftover, cancelling = asyncio.run(asyncio.wait_for(run(), 5))
+    assert out == ["a", "b", "c"]
+    assert n_tasks == 1  # just the stop watcher, never a task per event
+    assert closed == [True] and leftover == set() and cancelling == 0
+
+
+def test_astream_coalesced_stop_during_idle_read():
+    async def body():
+        yield b'data: {"choices":[{"delta":{"content":"Hel"}}]}\n\n'
+        yield b'data: {"choices":[{"delta":{"content":"lo"}}]}\n\n'
+        await asyncio.sleep(30)
+        yield b"data: [DONE]\n\n"
+
+    async def run(**kw):
+        core._async_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body()))
+        )
+        try:
+            with with_api_key("k"):
+                s = astream([{"role": "user", "content": "hi"}], "m", coalesce_ms=1000, **kw)
+                asyncio.get_running_loop().call_later(0.2, s.stop)
+                # stop() is cooperative: the loop ends normally, buffered text included
+                return [c async for c in s], getattr(asyncio.current_task(), "cancelling", lambda: 0)()
+        finally:
+            await aclose_openrouter()
+
+    for kw in ({}, {"buffer_limit": 4}):
+        chunks, cancelling = asyncio.run(asyncio.wait_for(run(**kw), 5))
+        assert chunks == _content("Hello"), kw
+        assert cancelling == 0
+
+
+def test_close_helpers_reset_shared_clients():
+    sync = core.get_sync_client()
+    core.close_http_client()
+    assert sync.is_closed and core.get_sync_client() is not sync
+
+    async def run():
+        client = core.get_async_client()
+        await aclose_openrouter()
+        return client
+    client = asyncio.run(run())
+    assert client.is_closed and core._sync_client is None and core._async_client is None
+    core.close_http_client()  # closing twice is harmless
+
+
+if __name__ == "__main__":
+    test_sse_data_lines()
+    test_sse_data_split_across_chunks()
+    test_sse_data_multiline_and_trailing()
+    test_astream_parses_events()
+    test_astream_coalesce_and_buffer_options()
+    test_coalesce_flushes_on_size_and_at_end()
+    test_coalesce_flushes_on_timeout()
+    test_coalesce_and_buffered_propagate_errors()
+    test_buffered_reads_ahead_and_stops_reader_early()
+    test_buffered_cancellation_event_cancels_reader()
+    test_coalesce_early_stop_cancels_pending_read()
+    test_until_set_reuses_one_watcher_and_wakes_idle_reads()
+    test_astream_coalesced_stop_during_idle_read()
+    test_close_helpers_reset_shared_clients()
+    print("openrouter stream tests passed")